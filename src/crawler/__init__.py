@@ -8,7 +8,7 @@ from .rate_limiter import RateLimiter, RobotsParser
 from .retry import RetryStrategy, TransientError, PermanentError, NetworkError, ParseError
 from .sitemap import SitemapParser
 from .stats import CrawlerStats
-from .storage import DataStorage, JSONStorage, CSVStorage, SQLiteStorage
+from .storage import DataStorage, JSONStorage, CSVStorage, SQLiteStorage, ParquetStorage
 
 __all__ = [
     "AdvancedCrawler",
@@ -24,6 +24,7 @@ __all__ = [
     "JSONStorage",
     "CSVStorage",
     "SQLiteStorage",
+    "ParquetStorage",
     "ConfigLoader",
     "HTMLParser",
     "TransientError",
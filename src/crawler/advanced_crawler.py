@@ -8,7 +8,7 @@ from crawler.config import ConfigLoader
 from crawler.fetcher import AsyncCrawler
 from crawler.sitemap import SitemapParser
 from crawler.stats import CrawlerStats
-from crawler.storage import DataStorage, JSONStorage, CSVStorage, SQLiteStorage
+from crawler.storage import DataStorage, JSONStorage, CSVStorage, SQLiteStorage, ParquetStorage
 
 logger = logging.getLogger(__name__)
 
@@ -59,7 +59,7 @@ class AdvancedCrawler:
         )
         
                                 
-        self.sitemap_parser = SitemapParser()
+        self.sitemap_parser = SitemapParser(max_concurrent=self.crawler.max_workers)
         
         logger.info("AdvancedCrawler initialized")
     
@@ -116,6 +116,7 @@ class AdvancedCrawler:
             return JSONStorage(
                 filename=json_config.get("filename", "results.json"),
                 buffer_size=json_config.get("buffer_size", 10),
+                output_format=json_config.get("output_format", "jsonl"),
             )
         elif storage_type == "csv":
             csv_config = storage_config.get("csv", {})
@@ -131,6 +132,12 @@ class AdvancedCrawler:
             )
                                                                       
             return storage
+        elif storage_type == "parquet":
+            parquet_config = storage_config.get("parquet", {})
+            return ParquetStorage(
+                filename=parquet_config.get("filename", "results.parquet"),
+                buffer_size=parquet_config.get("buffer_size", 1000),
+            )
         else:
             logger.warning(f"Unknown storage type: {storage_type}")
             return None
@@ -158,11 +165,8 @@ class AdvancedCrawler:
         sitemap_urls_config = self.config.get("urls", {}).get("sitemap_urls", [])
         for sitemap_url in sitemap_urls_config:
             try:
-                sitemap_urls = await self.sitemap_parser.fetch_sitemap(
-                    sitemap_url,
-                    self.crawler.session
-                )
-                urls.extend(sitemap_urls)
+                async for url in self.sitemap_parser.iter_sitemap(sitemap_url, self.crawler.session):
+                    urls.append(url)
             except Exception as e:
                 logger.error(f"Error fetching sitemap {sitemap_url}: {e}")
         
@@ -226,15 +230,15 @@ class AdvancedCrawler:
     def get_stats(self) -> Dict:
         return self.stats.get_stats()
     
-    def export_to_json(self, filename: Optional[str] = None) -> None:
+    async def export_to_json(self, filename: Optional[str] = None) -> None:
         if filename is None:
             filename = self.config.get("output", {}).get("stats_json", "stats.json")
-        self.stats.export_to_json(filename)
+        await self.stats.export_to_json(filename)
     
-    def export_to_html_report(self, filename: Optional[str] = None) -> None:
+    async def export_to_html_report(self, filename: Optional[str] = None) -> None:
         if filename is None:
             filename = self.config.get("output", {}).get("stats_html", "report.html")
-        self.stats.export_to_html_report(filename)
+        await self.stats.export_to_html_report(filename)
     
     async def close(self) -> None:
         await self.crawler.close()
@@ -48,7 +48,7 @@ def parse_args():
     )
     parser.add_argument(
         "--output",
-        help="Файл для сохранения результатов (JSON, CSV или SQLite)"
+        help="Файл для сохранения результатов (JSON, CSV, SQLite или Parquet)"
     )
     
                   
@@ -159,6 +159,9 @@ def merge_cli_with_config(config: dict, args: argparse.Namespace) -> dict:
         elif args.output.endswith(".db"):
             config["storage"]["type"] = "sqlite"
             config["storage"]["sqlite"]["filename"] = args.output
+        elif args.output.endswith(".parquet"):
+            config["storage"]["type"] = "parquet"
+            config["storage"]["parquet"]["filename"] = args.output
     
                            
     if args.log_level:
@@ -224,8 +227,8 @@ async def main():
         print("=" * 60)
         
                                  
-        crawler.export_to_json()
-        crawler.export_to_html_report()
+        await crawler.export_to_json()
+        await crawler.export_to_html_report()
         
         logger.info("Crawl completed successfully")
     
@@ -45,6 +45,7 @@ class ConfigLoader:
             "json": {
                 "filename": "results.json",
                 "buffer_size": 10,
+                "output_format": "jsonl",
             },
             "csv": {
                 "filename": "results.csv",
@@ -54,6 +55,10 @@ class ConfigLoader:
                 "filename": "results.db",
                 "batch_size": 50,
             },
+            "parquet": {
+                "filename": "results.parquet",
+                "buffer_size": 1000,
+            },
         },
         "logging": {
             "level": "INFO",                               
@@ -146,11 +146,12 @@ class AsyncCrawler:
                 headers={"User-Agent": self.user_agent},
             )
 
-    async def fetch_url(self, url: str) -> Dict[str, Any]:
+    async def fetch_url(self, url: str, domain: Optional[str] = None) -> Dict[str, Any]:
         if self.session is None:
             await self._create_session()
 
-        domain = self._get_domain(url)
+        if domain is None:
+            domain = self._get_domain(url)
 
                                                                       
         if self._circuit_is_open(domain):
@@ -191,8 +192,8 @@ class AsyncCrawler:
         results = await asyncio.gather(*tasks)
         return {url: html for url, html in zip(urls, results)}
 
-    async def fetch_and_parse(self, url: str) -> Dict[str, Any]:
-        html_data = await self.fetch_url(url)
+    async def fetch_and_parse(self, url: str, domain: Optional[str] = None) -> Dict[str, Any]:
+        html_data = await self.fetch_url(url, domain)
         if "error" in html_data:
             return html_data
         
@@ -365,7 +366,7 @@ class AsyncCrawler:
                                                           
         speed = stats["processed"] / elapsed if elapsed > 0 else 0
                                                                          
-        avg_delay = (sum(self.rate_limiter.delays) / len(self.rate_limiter.delays)) if self.rate_limiter.delays else 0.0
+        avg_delay = self.rate_limiter.mean_delay
         errors_total = sum(self.error_stats.values())
         
                                      
@@ -416,19 +417,20 @@ class AsyncCrawler:
                                  
         while True:
                                                
-            url = await self.queue.get_next()
+            entry = await self.queue.get_next_with_domain()
             
                                                                 
-            if url is None:
+            if entry is None:
                                                      
                 if tasks:
                     await asyncio.gather(*tasks, return_exceptions=True)
                     tasks = []
                 
                                                                   
-                url = await self.queue.get_next()
-                if url is None:
+                entry = await self.queue.get_next_with_domain()
+                if entry is None:
                     break
+            url, domain = entry
             
                                                      
             stats = self.queue.get_stats()
@@ -442,9 +444,6 @@ class AsyncCrawler:
                                          
             self.visited_urls.add(url)
             
-                                                       
-            domain = self._get_domain(url)
-            
                                               
             async def process_url(url: str, depth: int, domain: str) -> None:
                 try:
@@ -453,7 +452,7 @@ class AsyncCrawler:
                     
                     try:
                                                      
-                        parsed_data = await self.fetch_and_parse(url)
+                        parsed_data = await self.fetch_and_parse(url, domain)
                         
                                              
                         if "error" in parsed_data:
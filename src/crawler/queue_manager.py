@@ -1,8 +1,8 @@
 import asyncio
 import logging
 from collections import defaultdict
-from typing import Optional, Dict
-from urllib.parse import urlparse
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +39,8 @@ class CrawlerQueue:
             return False
         
                                                          
-        self._priority_queues[priority].append(normalized_url)
+        domain = urlsplit(normalized_url).hostname or ""
+        self._priority_queues[priority].append((normalized_url, domain))
         self._queued_urls.add(normalized_url)
         
         logger.debug(f"Added URL to queue: {normalized_url} (priority: {priority})")
@@ -60,28 +61,28 @@ class CrawlerQueue:
         return normalized_url
     
     async def get_next(self) -> Optional[str]:
-        async with self._lock:                                     
-                                                 
+        entry = await self.get_next_with_domain()
+        return entry[0] if entry else None
+    
+    async def get_next_with_domain(self) -> Optional[Tuple[str, str]]:
+        async with self._lock:
             if not self._queued_urls:
                 return None
             
-                                                            
             if not self._priority_queues:
                 return None
             
             max_priority = max(self._priority_queues.keys())
 
-                                                                           
             if self._priority_queues[max_priority]:
-                url = self._priority_queues[max_priority].pop(0)
+                url, domain = self._priority_queues[max_priority].pop(0)
                 self._queued_urls.remove(url)
                 
-                                                              
                 if not self._priority_queues[max_priority]:
                     del self._priority_queues[max_priority]
                 
                 logger.debug(f"Retrieved URL from queue: {url} (priority: {max_priority})")
-                return url
+                return url, domain
         
         return None
     
@@ -146,17 +147,7 @@ class SemaphoreManager:
         self._active_per_domain: Dict[str, int] = defaultdict(int)
     
     def _get_domain(self, url: str) -> str:
-        try:
-            parsed = urlparse(url)
-                                                      
-            domain = parsed.netloc or parsed.path.split('/')[0]
-                                     
-            if ':' in domain:
-                domain = domain.split(':')[0]
-            return domain
-        except Exception:
-                                                                       
-            return url
+        return urlsplit(url).hostname or url
     
     async def acquire(self, domain: str) -> None:
                                                                  
@@ -2,7 +2,9 @@ import asyncio
 import logging
 import random
 import time
-from typing import Dict, Optional
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Optional, Tuple
 from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
 
@@ -11,7 +13,33 @@ import aiohttp
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=65536)
+def _url_to_domain(url: str) -> str:
+    parsed = urlparse(url)
+    domain = parsed.netloc or parsed.path.split("/", 1)[0]
+    return domain.split(":", 1)[0].lower()
+
+
 class RateLimiter:
+    __slots__ = (
+        "per_domain",
+        "interval",
+        "min_delay",
+        "jitter",
+        "backoff_base",
+        "backoff_factor",
+        "backoff_max",
+        "_global_key",
+        "_min_interval",
+        "_use_jitter",
+        "_use_backoff",
+        "_backoff_table",
+        "_next_allowed",
+        "_error_counts",
+        "delays",
+        "_delay_sum",
+        "_delay_count",
+    )
 
     def __init__(
         self,
@@ -22,6 +50,7 @@ class RateLimiter:
         backoff_base: float = 0.0,
         backoff_factor: float = 2.0,
         backoff_max: float = 5.0,
+        delay_history: int = 1024,
     ):
         self.per_domain = per_domain
         self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
@@ -30,20 +59,27 @@ class RateLimiter:
         self.backoff_base = backoff_base
         self.backoff_factor = backoff_factor
         self.backoff_max = backoff_max
+        self._global_key = "global"
+        self._min_interval = max(self.interval, self.min_delay)
+        self._use_jitter = jitter > 0
+        self._use_backoff = backoff_base > 0
+        self._backoff_table = [min(backoff_base * backoff_factor ** i, backoff_max) for i in range(32)]
 
                                                                       
-        self._last_call: Dict[str, float] = {}
+        self._next_allowed: Dict[str, float] = {}
                                      
         self._error_counts: Dict[str, int] = {}
-                                           
-        self._lock = asyncio.Lock()
                              
-        self.delays: list[float] = []
+        self.delays: Deque[float] = deque(maxlen=delay_history)
+        self._delay_sum = 0.0
+        self._delay_count = 0
+
+    @property
+    def mean_delay(self) -> float:
+        return self._delay_sum / self._delay_count if self._delay_count else 0.0
 
     def _bucket_key(self, domain: Optional[str]) -> str:
-        if self.per_domain and domain:
-            return domain
-        return "global"
+        return domain if (self.per_domain and domain) else self._global_key
 
     def record_error(self, domain: Optional[str]) -> None:
         key = self._bucket_key(domain)
@@ -53,73 +89,59 @@ class RateLimiter:
         key = self._bucket_key(domain)
         self._error_counts[key] = 0
 
-    def _compute_sleep(self, key: str) -> float:
-        now = time.time()
-        last = self._last_call.get(key, 0.0)
-
-                                                    
-        wait_for_rate = self.interval - (now - last)
-
-                              
-        wait_for_min = self.min_delay - (now - last)
-
-                                                                     
-        wait_time = max(0.0, wait_for_rate, wait_for_min)
+    def _compute_sleep(self, key: str, now: float) -> float:
+        deadline = self._next_allowed.get(key, now)
+        wait_time = deadline - now if deadline > now else 0.0
 
-                                                         
-        if self.jitter > 0:
+        if self._use_jitter:
             wait_time += random.uniform(0, self.jitter)
 
-                                                         
-        error_count = self._error_counts.get(key, 0)
-        if self.backoff_base > 0 and error_count > 0:
-            backoff_delay = min(
-                self.backoff_base * (self.backoff_factor ** (error_count - 1)),
-                self.backoff_max,
-            )
-            wait_time = max(wait_time, backoff_delay)
+        if self._use_backoff:
+            error_count = self._error_counts.get(key, 0)
+            if error_count > 0:
+                backoff_delay = self._backoff_table[min(error_count, len(self._backoff_table)) - 1]
+                if backoff_delay > wait_time:
+                    wait_time = backoff_delay
 
         return wait_time
 
     async def acquire(self, domain: Optional[str] = None) -> None:
         key = self._bucket_key(domain)
-        async with self._lock:
-            sleep_time = self._compute_sleep(key)
-            if sleep_time > 0:
-                await asyncio.sleep(sleep_time)
-                                     
-            self._last_call[key] = time.time()
-                                           
-            self.delays.append(sleep_time)
+        now = time.monotonic()
+        sleep_time = self._compute_sleep(key, now)
+        self._next_allowed[key] = now + sleep_time + self._min_interval
+        self.delays.append(sleep_time)
+        self._delay_sum += sleep_time
+        self._delay_count += 1
+        if sleep_time > 0:
+            await asyncio.sleep(sleep_time)
 
 
 class RobotsParser:
+    __slots__ = ("user_agent", "ttl", "negative_ttl", "_cache", "_inflight")
 
-    def __init__(self, user_agent: str = "*"):
+    def __init__(self, user_agent: str = "*", ttl: float = 6 * 3600, negative_ttl: float = 60.0):
         self.user_agent = user_agent
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
                                        
-        self._cache: Dict[str, RobotFileParser] = {}
-                                                     
-        self._lock = asyncio.Lock()
+        self._cache: Dict[str, Tuple[Optional[RobotFileParser], float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
 
     def _get_domain(self, url: str) -> str:
-        parsed = urlparse(url)
-        domain = parsed.netloc or parsed.path.split("/")[0]
-        if ":" in domain:
-            domain = domain.split(":")[0]
-        return domain.lower()
-
-    async def fetch_robots(self, base_url: str, session: Optional[aiohttp.ClientSession]) -> Optional[RobotFileParser]:
-        domain = self._get_domain(base_url)
-        async with self._lock:
-            if domain in self._cache:
-                return self._cache[domain]
-
-                                                                       
-        if session is None:
-            return None
-
-        robots_url = f"{base_url.rstrip('/')}/robots.txt"
+        return _url_to_domain(url)
+
+    def _get_cached(self, domain: str) -> Tuple[bool, Optional[RobotFileParser]]:
+        entry = self._cache.get(domain)
+        if entry is None:
+            return False, None
+        parser, fetched_at = entry
+        ttl = self.ttl if parser is not None else self.negative_ttl
+        if time.monotonic() - fetched_at < ttl:
+            return True, parser
+        return False, None
+
+    async def _download(self, robots_url: str, domain: str, session: aiohttp.ClientSession) -> Optional[RobotFileParser]:
         try:
             async with session.get(robots_url) as resp:
                 if resp.status >= 400:
@@ -133,30 +155,50 @@ class RobotsParser:
         parser = RobotFileParser()
         parser.set_url(robots_url)
         parser.parse(content.splitlines())
+        return parser
 
-        async with self._lock:
-            self._cache[domain] = parser
+    async def fetch_robots(self, base_url: str, session: Optional[aiohttp.ClientSession]) -> Optional[RobotFileParser]:
+        domain = self._get_domain(base_url)
+        hit, parser = self._get_cached(domain)
+        while not hit:
+            inflight = self._inflight.get(domain)
+            if inflight is None:
+                break
+            hit, parser = await asyncio.shield(inflight)
+        if hit:
+            return parser
 
+        if session is None:
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[domain] = future
+        robots_url = f"{base_url.rstrip('/')}/robots.txt"
+        try:
+            parser = await self._download(robots_url, domain, session)
+        except BaseException:
+            future.set_result((False, None))
+            raise
+        finally:
+            del self._inflight[domain]
+
+        self._cache[domain] = (parser, time.monotonic())
+        future.set_result((True, parser))
         return parser
 
     async def can_fetch(self, url: str, session: Optional[aiohttp.ClientSession], user_agent: Optional[str] = None) -> bool:
         domain = self._get_domain(url)
         ua = user_agent or self.user_agent
-        parser = self._cache.get(domain)
+        parser = await self.fetch_robots(f"https://{domain}", session)
         if parser is None:
-            parser = await self.fetch_robots(f"https://{domain}", session)
-                                                        
-            if parser is None:
-                return True
+            return True
         return parser.can_fetch(ua, url)
 
     async def get_crawl_delay(self, url: str, session: Optional[aiohttp.ClientSession], user_agent: Optional[str] = None) -> float:
         domain = self._get_domain(url)
         ua = user_agent or self.user_agent
-        parser = self._cache.get(domain)
+        parser = await self.fetch_robots(f"https://{domain}", session)
         if parser is None:
-            parser = await self.fetch_robots(f"https://{domain}", session)
-            if parser is None:
-                return 0.0
+            return 0.0
         delay = parser.crawl_delay(ua)
         return float(delay) if delay is not None else 0.0
\ No newline at end of file
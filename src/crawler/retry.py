@@ -1,7 +1,8 @@
 import asyncio
 import logging
 import time
-from typing import Callable, Coroutine, List, Optional, Type, Any
+from collections import deque
+from typing import Callable, Coroutine, Deque, List, Optional, Type, Any
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,18 @@ class ParseError(Exception):
 
 
 class RetryStrategy:
+    __slots__ = (
+        "max_retries",
+        "backoff_factor",
+        "base_delay",
+        "retry_on",
+        "_retry_types",
+        "_err_map",
+        "_retry_backoffs",
+        "error_stats",
+        "retry_successes",
+        "retry_delays",
+    )
 
     def __init__(
         self,
@@ -31,11 +44,20 @@ class RetryStrategy:
         backoff_factor: float = 2.0,
         base_delay: float = 0.5,
         retry_on: Optional[List[Type[Exception]]] = None,
+        delay_history: int = 1024,
     ):
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
         self.base_delay = base_delay
         self.retry_on = retry_on or [TransientError, NetworkError]
+        self._retry_types = tuple(self.retry_on)
+        self._err_map = {
+            TransientError: "transient",
+            NetworkError: "network",
+            PermanentError: "permanent",
+            ParseError: "parse",
+        }
+        self._retry_backoffs = [base_delay * backoff_factor ** i for i in range(32)]
 
                     
         self.error_stats = {
@@ -46,22 +68,16 @@ class RetryStrategy:
             "other": 0,
         }
         self.retry_successes = 0
-        self.retry_delays: list[float] = []
+        self.retry_delays: Deque[float] = deque(maxlen=delay_history)
 
     def _should_retry(self, err: Exception) -> bool:
-        return any(isinstance(err, cls) for cls in self.retry_on)
+        return isinstance(err, self._retry_types)
 
     def _classify_and_count(self, err: Exception) -> None:
-        if isinstance(err, TransientError):
-            self.error_stats["transient"] += 1
-        elif isinstance(err, NetworkError):
-            self.error_stats["network"] += 1
-        elif isinstance(err, PermanentError):
-            self.error_stats["permanent"] += 1
-        elif isinstance(err, ParseError):
-            self.error_stats["parse"] += 1
-        else:
-            self.error_stats["other"] += 1
+        key = self._err_map.get(type(err))
+        if key is None:
+            key = next((name for cls, name in self._err_map.items() if isinstance(err, cls)), "other")
+        self.error_stats[key] += 1
 
     async def execute_with_retry(self, coro: Callable[..., Coroutine[Any, Any, Any]], *args, **kwargs):
         attempt = 0
@@ -83,7 +99,7 @@ class RetryStrategy:
                     raise
 
                                                              
-                delay = self.base_delay * (self.backoff_factor ** attempt)
+                delay = self._retry_backoffs[min(attempt, len(self._retry_backoffs) - 1)]
                 self.retry_delays.append(delay)
                 attempt += 1
 
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+import weakref
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+SHARED_LIMIT_PER_HOST = 16
+
+_shared_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    for stale in [other for other in _shared_sessions if other.is_closed()]:
+        del _shared_sessions[stale]
+    session = _shared_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=SHARED_LIMIT_PER_HOST,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True,
+        )
+        session = _shared_sessions[loop] = aiohttp.ClientSession(connector=connector)
+        logger.debug("Created shared aiohttp session")
+    return session
+
+
+async def close_shared_session() -> None:
+    session = _shared_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+        logger.debug("Closed shared aiohttp session")
@@ -1,115 +1,347 @@
 import asyncio
 import logging
-from typing import List, Set
-from urllib.parse import urljoin, urlparse
-from xml.etree import ElementTree as ET
+import re
+import zlib
+from collections import OrderedDict
+from contextlib import aclosing
+from html import unescape
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin
 
 import aiohttp
+from lxml import etree
+
+from crawler.session import SHARED_LIMIT_PER_HOST, get_shared_session
 
 logger = logging.getLogger(__name__)
 
+_SITEMAP_RE = re.compile(rb"(?im)^\s*sitemap\s*:\s*(\S+)\s*$")
+_LOC_RE = re.compile(rb"<loc(?:\s[^>]*)?>\s*(?:<!\[CDATA\[\s*(.*?)\s*\]\]>|([^<\s][^<]*?))\s*</loc>", re.S)
+_SNIFF_BYTES = 1024
+_GZIP_MAGIC = b"\x1f\x8b"
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+_LOCAL_NAMES = {f"{{{SITEMAP_NS}}}{name}": name for name in ("loc", "url", "sitemap", "urlset", "sitemapindex")}
+_ENTRY_TAGS = frozenset(("url", "sitemap"))
+
 
 class SitemapParser:
     
-    def __init__(self, session: aiohttp.ClientSession = None):
+    def __init__(self, session: aiohttp.ClientSession = None, max_concurrent: int = SHARED_LIMIT_PER_HOST, max_visited: int = 10000):
         self.session = session
-        self.visited_sitemaps: Set[str] = set()                                      
+        self.max_concurrent = max_concurrent
+        self._sem = asyncio.Semaphore(max_concurrent)
+        self.max_visited = max_visited
+        self.visited_sitemaps: "OrderedDict[str, None]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waits_on: Dict[str, Set[str]] = {}
+    
+    def _mark_visited(self, url: str) -> bool:
+        if url in self.visited_sitemaps:
+            self.visited_sitemaps.move_to_end(url)
+            return False
+        self.visited_sitemaps[url] = None
+        if len(self.visited_sitemaps) > self.max_visited:
+            self.visited_sitemaps.popitem(last=False)
+        return True
     
     async def fetch_sitemap(self, sitemap_url: str, session: aiohttp.ClientSession = None) -> List[str]:
+        return [url async for url in self.iter_sitemap(sitemap_url, session)]
+    
+    def _reaches(self, key: str, target: str) -> bool:
+        stack = [key]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node == target:
+                return True
+            if node not in seen:
+                seen.add(node)
+                stack.extend(self._waits_on.get(node, ()))
+        return False
+    
+    def _wait(self, parent: Optional[str], key: str) -> None:
+        if parent is not None:
+            self._waits_on.setdefault(parent, set()).add(key)
+    
+    def _unwait(self, parent: Optional[str], key: str) -> None:
+        if parent is not None:
+            waits = self._waits_on[parent]
+            waits.discard(key)
+            if not waits:
+                del self._waits_on[parent]
+    
+    async def iter_sitemap(self, sitemap_url: str, session: aiohttp.ClientSession = None) -> AsyncIterator[str]:
                                                       
-        http_session = session or self.session
-        
-        if not http_session:
-            raise ValueError("Session is required for fetching sitemap")
+        http_session = session or self.session or get_shared_session()
         
                                  
         normalized_url = sitemap_url.rstrip('/')
         
+        async with aclosing(self._walk(normalized_url, http_session, set(), None)) as entries:
+            async for _, url in entries:
+                yield url
+    
+    async def _walk(
+        self, sitemap_url: str, http_session: aiohttp.ClientSession, seen: Set[str], parent: Optional[str]
+    ) -> AsyncIterator[Tuple[str, str]]:
+        if sitemap_url in seen:
+            return
+        seen.add(sitemap_url)
+        
+        while sitemap_url in self._inflight:
+            if parent is not None and self._reaches(sitemap_url, parent):
+                logger.debug("Sitemap cycle through %s", sitemap_url)
+                return
+            self._wait(parent, sitemap_url)
+            try:
+                chunks = await asyncio.shield(self._inflight[sitemap_url])
+            finally:
+                self._unwait(parent, sitemap_url)
+            if chunks is None:
+                continue
+            for source, urls in chunks:
+                if source != sitemap_url:
+                    if source in seen:
+                        continue
+                    seen.add(source)
+                for url in urls:
+                    yield source, url
+            return
+        
                                                                            
-        if normalized_url in self.visited_sitemaps:
-            logger.debug(f"Sitemap already visited: {normalized_url}")
-            return []
+        if not self._mark_visited(sitemap_url):
+            logger.debug("Sitemap already visited: %s", sitemap_url)
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[sitemap_url] = future
+        self._wait(parent, sitemap_url)
+        chunks: Dict[str, List[str]] = {}
+        complete = False
+        try:
+            async with aclosing(self._iter_owned(sitemap_url, http_session, seen)) as entries:
+                async for source, url in entries:
+                    chunks.setdefault(source, []).append(url)
+                    yield source, url
+            complete = True
+        finally:
+            del self._inflight[sitemap_url]
+            self._unwait(parent, sitemap_url)
+            if not complete:
+                self.visited_sitemaps.pop(sitemap_url, None)
+            future.set_result(list(chunks.items()) if complete else None)
+    
+    async def _iter_owned(
+        self, sitemap_url: str, http_session: aiohttp.ClientSession, seen: Set[str]
+    ) -> AsyncIterator[Tuple[str, str]]:
+        nested_sitemaps: List[str] = []
+        count = 0
+        try:
+            async with self._sem:
+                async for tag, loc in self._stream_locs(sitemap_url, http_session):
+                    if tag == "url":
+                        count += 1
+                        yield sitemap_url, loc
+                    else:
+                        nested_sitemaps.append(loc.rstrip('/'))
+        except aiohttp.ClientError as e:
+            logger.error(f"Error fetching sitemap {sitemap_url}: {e}")
+            return
+        except Exception as e:
+            logger.error(f"Unexpected error processing sitemap {sitemap_url}: {e}", exc_info=True)
+            return
         
-        self.visited_sitemaps.add(normalized_url)
+        if nested_sitemaps:
+            logger.info("Found sitemap index with %d sitemaps", len(nested_sitemaps))
+            async for entry in self._iter_nested(nested_sitemaps, http_session, seen, sitemap_url):
+                count += 1
+                yield entry
         
+        logger.info("Extracted %d URLs from sitemap %s", count, sitemap_url)
+    
+    async def _iter_nested(
+        self, sitemap_urls: List[str], http_session: aiohttp.ClientSession, seen: Set[str], parent: str
+    ) -> AsyncIterator[Tuple[str, str]]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1024)
+        finished = object()
+        
+        async def pump(sitemap_url: str) -> None:
+            try:
+                async with aclosing(self._walk(sitemap_url, http_session, seen, parent)) as entries:
+                    async for entry in entries:
+                        await queue.put(entry)
+            except Exception as e:
+                logger.error(f"Error fetching nested sitemap {sitemap_url}: {e}")
+            await queue.put(finished)
+        
+        tasks = [asyncio.create_task(pump(sitemap_url)) for sitemap_url in sitemap_urls]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is finished:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _stream_locs(self, url: str, http_session: aiohttp.ClientSession) -> AsyncIterator[Tuple[str, str]]:
+        logger.info("Fetching sitemap: %s", url)
+        async with http_session.get(url) as response:
+            response.raise_for_status()
+            chunks = response.content.iter_chunked(65536).__aiter__()
+            head = await self._read_head(chunks)
+            if head.startswith(_GZIP_MAGIC):
+                chunks = self._gunzip(head, chunks)
+                head = await self._read_head(chunks)
+            sniff = head[:_SNIFF_BYTES]
+            if b"<urlset" in sniff and b"<sitemapindex" not in sniff:
+                entries = self._regex_locs(head, chunks)
+            else:
+                entries = self._xml_locs(head, chunks)
+            async for entry in entries:
+                yield entry
+        logger.debug(
+            "Fetched sitemap: %s (status=%s, content_length=%s)",
+            url,
+            getattr(response, "status", None),
+            getattr(response, "content_length", None),
+        )
+    
+    @staticmethod
+    async def _read_head(chunks: AsyncIterator[bytes]) -> bytes:
+        head = b""
+        while len(head) < _SNIFF_BYTES:
+            chunk = await anext(chunks, None)
+            if chunk is None:
+                break
+            head += chunk
+        return head
+    
+    @staticmethod
+    async def _gunzip(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        decompressor = zlib.decompressobj(wbits=31)
+        data = head
+        while True:
+            while data:
+                out = decompressor.decompress(data, 65536)
+                if out:
+                    yield out
+                data = decompressor.unconsumed_tail
+            chunk = await anext(chunks, None)
+            if chunk is None:
+                break
+            data = chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+    
+    async def _xml_locs(self, head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[str, str]]:
+        xml_parser = etree.XMLPullParser(events=("end",), huge_tree=False, remove_blank_text=True)
+        entries: List[Tuple[str, str]] = []
         try:
-                               
-            logger.info(f"Fetching sitemap: {normalized_url}")
-            async with http_session.get(normalized_url) as response:
-                response.raise_for_status()
-                content = await response.text(encoding='utf-8')
-            logger.debug(
-                "Fetched sitemap: %s (status=%s, bytes~=%s)",
-                normalized_url,
-                getattr(response, "status", None),
-                len(content) if content else 0,
-            )
-            
-                        
+            xml_parser.feed(head)
+            self._collect_locs(xml_parser, entries)
+            async for chunk in chunks:
+                for entry in entries:
+                    yield entry
+                entries.clear()
+                xml_parser.feed(chunk)
+                self._collect_locs(xml_parser, entries)
+            xml_parser.close()
+            self._collect_locs(xml_parser, entries)
+        except etree.XMLSyntaxError as e:
+            logger.error(f"Error parsing sitemap XML: {e}")
+        for entry in entries:
+            yield entry
+    
+    @staticmethod
+    async def _regex_locs(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[str, str]]:
+        pending = head
+        while True:
+            last = 0
+            for match in _LOC_RE.finditer(pending):
+                last = match.end()
+                raw = match.group(1) if match.group(2) is None else match.group(2)
+                if not raw:
+                    continue
+                loc = raw.decode("utf-8", "replace")
+                if "&" in loc:
+                    loc = unescape(loc)
+                yield "url", loc
+            tail = pending[last:]
+            start = tail.rfind(b"<loc")
+            pending = tail[start:] if start != -1 else tail[-4:]
+            chunk = await anext(chunks, None)
+            if chunk is None:
+                return
+            pending += chunk
+    
+    @staticmethod
+    def _collect_locs(xml_parser, entries: List[Tuple[str, str]]) -> None:
+        local_names = _LOCAL_NAMES
+        for _, elem in xml_parser.read_events():
+            tag = local_names.get(elem.tag) or elem.tag.rpartition("}")[2]
+            if tag == "loc":
+                parent = elem.getparent()
+                if parent is None:
+                    continue
+                kind = local_names.get(parent.tag) or parent.tag.rpartition("}")[2]
+                loc = elem.text
+                if kind in _ENTRY_TAGS and loc and loc.strip():
+                    entries.append((kind, loc.strip()))
+                continue
+            if tag not in _ENTRY_TAGS:
+                continue
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+    
+    @staticmethod
+    async def _probe(url: str, http_session: aiohttp.ClientSession) -> bool:
+        try:
+            async with http_session.head(url, allow_redirects=True) as response:
+                return 200 <= response.status < 300 or response.status in (405, 501)
+        except Exception:
+            return False
+    
+    def _scoped(self) -> "SitemapParser":
+        parser = SitemapParser(session=self.session, max_concurrent=self.max_concurrent, max_visited=self.max_visited)
+        parser._sem = self._sem
+        parser.visited_sitemaps = OrderedDict(self.visited_sitemaps)
+        return parser
+    
+    async def _first_non_empty(
+        self, sitemap_urls: List[str], http_session: aiohttp.ClientSession
+    ) -> Tuple[Optional[str], List[str]]:
+        async def fetch(parser: "SitemapParser", sitemap_url: str) -> List[str]:
             try:
-                root = ET.fromstring(content)
-            except ET.ParseError as e:
-                logger.error(f"Error parsing sitemap XML: {e}")
+                return await parser.fetch_sitemap(sitemap_url, http_session)
+            except Exception:
                 return []
-            
-                                                                           
-                                                           
-            namespaces = {}
-            if root.tag.startswith('{'):
-                                               
-                namespace = root.tag.split('}')[0].strip('{')
-                namespaces['s'] = namespace
-                                                       
-                url_tag = f"{{{namespace}}}url"
-                sitemap_tag = f"{{{namespace}}}sitemap"
-                loc_tag = f"{{{namespace}}}loc"
-            else:
-                               
-                url_tag = "url"
-                sitemap_tag = "sitemap"
-                loc_tag = "loc"
-            
-            urls: List[str] = []
-            
-                                                          
-                                                                     
-            sitemap_elements = root.findall(f".//{sitemap_tag}")
-            url_elements = root.findall(f".//{url_tag}")
-            
-            if sitemap_elements:
-                                                                 
-                logger.info(f"Found sitemap index with {len(sitemap_elements)} sitemaps")
-                for sitemap_elem in sitemap_elements:
-                    loc_elem = sitemap_elem.find(loc_tag)
-                    if loc_elem is not None and loc_elem.text:
-                        nested_sitemap_url = loc_elem.text.strip()
-                                                                   
-                        nested_urls = await self.fetch_sitemap(nested_sitemap_url, http_session)
-                        urls.extend(nested_urls)
-            
-            if url_elements:
-                                                     
-                logger.info(f"Found {len(url_elements)} URLs in sitemap")
-                for url_elem in url_elements:
-                    loc_elem = url_elem.find(loc_tag)
-                    if loc_elem is not None and loc_elem.text:
-                        url = loc_elem.text.strip()
-                        urls.append(url)
-            
-            logger.info(f"Extracted {len(urls)} URLs from sitemap {normalized_url}")
-            return urls
         
-        except aiohttp.ClientError as e:
-            logger.error(f"Error fetching sitemap {normalized_url}: {e}")
-            return []
-        except Exception as e:
-            logger.error(f"Unexpected error processing sitemap {normalized_url}: {e}", exc_info=True)
-            return []
+        scopes = [self._scoped() for _ in sitemap_urls]
+        tasks = [asyncio.create_task(fetch(parser, sitemap_url)) for parser, sitemap_url in zip(scopes, sitemap_urls)]
+        try:
+            for sitemap_url, parser, task in zip(sitemap_urls, scopes, tasks):
+                urls = await task
+                if urls:
+                    for url in parser.visited_sitemaps:
+                        if url not in self.visited_sitemaps:
+                            self._mark_visited(url)
+                    return sitemap_url, urls
+        finally:
+            for task in tasks:
+                task.cancel()
+        return None, []
     
     async def discover_sitemap_urls(self, base_url: str, session: aiohttp.ClientSession = None) -> List[str]:
-        http_session = session or self.session
-        if not http_session:
-            raise ValueError("Session is required")
+        http_session = session or self.session or get_shared_session()
         
                                       
         sitemap_paths = [
@@ -119,32 +351,24 @@ class SitemapParser:
             "/sitemaps/sitemap.xml",
         ]
         
-                                          
-        for path in sitemap_paths:
-            sitemap_url = urljoin(base_url, path)
-            try:
-                urls = await self.fetch_sitemap(sitemap_url, http_session)
-                if urls:
-                    logger.info(f"Found sitemap at {sitemap_url} with {len(urls)} URLs")
-                    return urls
-            except Exception:
-                                                  
-                continue
+        candidates = [urljoin(base_url, path) for path in sitemap_paths]
+        probes = await asyncio.gather(*(self._probe(url, http_session) for url in candidates))
+        live = [url for url, available in zip(candidates, probes) if available]
+        sitemap_url, urls = await self._first_non_empty(live, http_session)
+        if urls:
+            logger.info(f"Found sitemap at {sitemap_url} with {len(urls)} URLs")
+            return urls
         
                                                                  
         try:
             robots_url = urljoin(base_url, "/robots.txt")
             async with http_session.get(robots_url) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    for line in content.split('\n'):
-                        line = line.strip()
-                        if line.lower().startswith('sitemap:'):
-                            sitemap_url = line.split(':', 1)[1].strip()
-                            urls = await self.fetch_sitemap(sitemap_url, http_session)
-                            if urls:
-                                logger.info(f"Found sitemap from robots.txt: {sitemap_url}")
-                                return urls
+                content = await response.read() if response.status == 200 else b""
+            sitemap_urls = list(dict.fromkeys(match.decode("utf-8", "ignore") for match in _SITEMAP_RE.findall(content)))
+            sitemap_url, urls = await self._first_non_empty(sitemap_urls, http_session)
+            if urls:
+                logger.info(f"Found sitemap from robots.txt: {sitemap_url}")
+                return urls
         except Exception as e:
             logger.debug(f"Could not check robots.txt for sitemap: {e}")
         
@@ -1,221 +1,121 @@
+import asyncio
+import heapq
 import json
 import logging
+import re
+import sys
 import time
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from html import escape
+from operator import attrgetter
+from string import Template
+from typing import Deque, Dict, List, Optional, TextIO, Tuple
 from urllib.parse import urlparse
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+_AUTHORITY = re.compile(r"[A-Za-z][A-Za-z0-9+.\-]*://([^/?#]*)").match
+_STATUS_SLOTS = 600
+_BY_PAGES = attrgetter("pages")
 
-class CrawlerStats:
-    
-    def __init__(self):
-                           
-        self.start_time: Optional[float] = None
-        self.end_time: Optional[float] = None
-        
-                  
-        self.total_pages = 0                            
-        self.successful = 0                     
-        self.failed = 0                      
-        self.blocked = 0                              
-        
-                                    
-        self.status_codes: Dict[int, int] = defaultdict(int)
-        
-                               
-        self.domain_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {
-            "pages": 0,
-            "successful": 0,
-            "failed": 0,
-        })
-        
-                                               
-        self.page_times: List[float] = []                                   
-        
-                
-        self.errors: List[Dict[str, str]] = []                               
-    
-    def start(self) -> None:
-        self.start_time = time.time()
-        logger.info("Crawler stats started")
-    
-    def stop(self) -> None:
-        self.end_time = time.time()
-        logger.info("Crawler stats stopped")
-    
-    def add_page(self, url: str, status: str, page_time: float, error: Optional[str] = None) -> None:
-        self.total_pages += 1
-        self.page_times.append(page_time)
-        
-                                
-        try:
-            domain = urlparse(url).netloc
-            if ':' in domain:
-                domain = domain.split(':')[0]
-        except Exception:
-            domain = "unknown"
-        
-                                        
-        self.domain_stats[domain]["pages"] += 1
-        
-                                    
-        if status == "success":
-            self.successful += 1
-            self.domain_stats[domain]["successful"] += 1
-        elif status == "failed":
-            self.failed += 1
-            self.domain_stats[domain]["failed"] += 1
-            if error:
-                self.errors.append({"url": url, "error": error, "domain": domain})
-        elif status == "blocked":
-            self.blocked += 1
-    
-    def add_status_code(self, status_code: int) -> None:
-        self.status_codes[status_code] += 1
-    
-    def get_stats(self) -> Dict:
-        elapsed_time = (self.end_time or time.time()) - (self.start_time or time.time())
-        
-                                    
-        avg_speed = self.total_pages / elapsed_time if elapsed_time > 0 else 0
-        
-                                                    
-        avg_page_time = sum(self.page_times) / len(self.page_times) if self.page_times else 0
-        
-                                           
-        top_domains = sorted(
-            self.domain_stats.items(),
-            key=lambda x: x[1]["pages"],
-            reverse=True
-        )[:10]          
-        
-        return {
-            "total_pages": self.total_pages,
-            "successful": self.successful,
-            "failed": self.failed,
-            "blocked": self.blocked,
-            "status_codes": dict(self.status_codes),
-            "domains": {domain: dict(stats) for domain, stats in self.domain_stats.items()},
-            "top_domains": [
-                {"domain": domain, "pages": stats["pages"], "successful": stats["successful"], "failed": stats["failed"]}
-                for domain, stats in top_domains
-            ],
-            "performance": {
-                "elapsed_time": elapsed_time,
-                "avg_speed": avg_speed,                     
-                "avg_page_time": avg_page_time,                      
-                "total_time": sum(self.page_times),
-            },
-            "errors_count": len(self.errors),
-        }
-    
-    def export_to_json(self, filename: str) -> None:
-        stats = self.get_stats()
-        
-                              
-        export_data = {
-            "exported_at": datetime.now().isoformat(),
-            "stats": stats,
-            "errors": self.errors[:100],                                                 
-        }
-        
-        try:
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"Stats exported to JSON: {filename}")
-        except Exception as e:
-            logger.error(f"Error exporting stats to JSON: {e}", exc_info=True)
-    
-    def export_to_html_report(self, filename: str) -> None:
-        stats = self.get_stats()
-        
-                        
-        html = f"""<!DOCTYPE html>
+
+_HTML_HEAD = """<!DOCTYPE html>
 <html lang="ru">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Отчёт краулера</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             margin: 20px;
             background-color: #f5f5f5;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             background: white;
             padding: 20px;
             border-radius: 8px;
             box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        h1 {{
+        }
+        h1 {
             color: #333;
             border-bottom: 3px solid #4CAF50;
             padding-bottom: 10px;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #555;
             margin-top: 30px;
-        }}
-        .stats-grid {{
+        }
+        .stats-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 20px;
             margin: 20px 0;
-        }}
-        .stat-card {{
+        }
+        .stat-card {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 20px;
             border-radius: 8px;
             text-align: center;
-        }}
-        .stat-card.success {{
+        }
+        .stat-card.success {
             background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-        }}
-        .stat-card.error {{
+        }
+        .stat-card.error {
             background: linear-gradient(135deg, #eb3349 0%, #f45c43 100%);
-        }}
-        .stat-value {{
+        }
+        .stat-value {
             font-size: 2.5em;
             font-weight: bold;
             margin: 10px 0;
-        }}
-        .stat-label {{
+        }
+        .stat-label {
             font-size: 0.9em;
             opacity: 0.9;
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             border-collapse: collapse;
             margin: 20px 0;
-        }}
-        th, td {{
+        }
+        th, td {
             padding: 12px;
             text-align: left;
             border-bottom: 1px solid #ddd;
-        }}
-        th {{
+        }
+        th {
             background-color: #4CAF50;
             color: white;
-        }}
-        tr:hover {{
+        }
+        td.truncate {
+            max-width: 480px;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            white-space: nowrap;
+        }
+        tr:hover {
             background-color: #f5f5f5;
-        }}
-        .progress-bar {{
+        }
+        .progress-bar {
             width: 100%;
             height: 30px;
             background-color: #e0e0e0;
             border-radius: 15px;
             overflow: hidden;
             margin: 10px 0;
-        }}
-        .progress-fill {{
+        }
+        .progress-fill {
             height: 100%;
             background: linear-gradient(90deg, #4CAF50, #8BC34A);
             display: flex;
@@ -223,36 +123,38 @@ class CrawlerStats:
             justify-content: center;
             color: white;
             font-weight: bold;
-        }}
-        .timestamp {{
+        }
+        .timestamp {
             color: #888;
             font-size: 0.9em;
             margin-top: 20px;
-        }}
+        }
     </style>
 </head>
 <body>
     <div class="container">
-        <h1>📊 Отчёт краулера</h1>
-        <p class="timestamp">Создан: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+"""
+
+_REPORT_HEADER = Template("""        <h1>📊 Отчёт краулера</h1>
+        <p class="timestamp">Создан: $generated_at</p>
         
         <h2>Общая статистика</h2>
         <div class="stats-grid">
             <div class="stat-card">
                 <div class="stat-label">Всего страниц</div>
-                <div class="stat-value">{stats['total_pages']}</div>
+                <div class="stat-value">$total_pages</div>
             </div>
             <div class="stat-card success">
                 <div class="stat-label">Успешно</div>
-                <div class="stat-value">{stats['successful']}</div>
+                <div class="stat-value">$successful</div>
             </div>
             <div class="stat-card error">
                 <div class="stat-label">Ошибок</div>
-                <div class="stat-value">{stats['failed']}</div>
+                <div class="stat-value">$failed</div>
             </div>
             <div class="stat-card">
                 <div class="stat-label">Заблокировано</div>
-                <div class="stat-value">{stats['blocked']}</div>
+                <div class="stat-value">$blocked</div>
             </div>
         </div>
         
@@ -264,15 +166,15 @@ class CrawlerStats:
             </tr>
             <tr>
                 <td>Время работы</td>
-                <td>{stats['performance']['elapsed_time']:.2f} сек</td>
+                <td>$elapsed_time сек</td>
             </tr>
             <tr>
                 <td>Средняя скорость</td>
-                <td>{stats['performance']['avg_speed']:.2f} страниц/сек</td>
+                <td>$avg_speed страниц/сек</td>
             </tr>
             <tr>
                 <td>Среднее время на страницу</td>
-                <td>{stats['performance']['avg_page_time']:.3f} сек</td>
+                <td>$avg_page_time сек</td>
             </tr>
         </table>
         
@@ -283,15 +185,11 @@ class CrawlerStats:
                 <th>Количество</th>
                 <th>Процент</th>
             </tr>
-"""
-        
-                                           
-        total_with_status = sum(stats['status_codes'].values())
-        for status_code, count in sorted(stats['status_codes'].items()):
-            percentage = (count / total_with_status * 100) if total_with_status > 0 else 0
-            html += f"""
+""")
+
+_STATUS_ROW = """
             <tr>
-                <td>{status_code}</td>
+                <td>{code}</td>
                 <td>{count}</td>
                 <td>
                     <div class="progress-bar">
@@ -299,9 +197,9 @@ class CrawlerStats:
                     </div>
                 </td>
             </tr>
-"""
-        
-        html += """
+""".format
+
+_DOMAINS_HEADER = """
         </table>
         
         <h2>Топ доменов</h2>
@@ -313,51 +211,282 @@ class CrawlerStats:
                 <th>Ошибок</th>
             </tr>
 """
-        
-                               
-        for domain_info in stats['top_domains']:
-            html += f"""
+
+_DOMAIN_ROW = """
             <tr>
-                <td>{domain_info['domain']}</td>
-                <td>{domain_info['pages']}</td>
-                <td>{domain_info['successful']}</td>
-                <td>{domain_info['failed']}</td>
+                <td>{domain}</td>
+                <td>{pages}</td>
+                <td>{successful}</td>
+                <td>{failed}</td>
             </tr>
-"""
-        
-        html += f"""
+""".format
+
+_ERRORS_HEADER = Template("""
         </table>
         
         <h2>Ошибки</h2>
-        <p>Всего ошибок: {stats['errors_count']}</p>
+        <p>Всего ошибок: $errors_count</p>
         <table>
             <tr>
                 <th>URL</th>
                 <th>Домен</th>
                 <th>Ошибка</th>
             </tr>
-"""
-        
-                                    
-        for error in self.errors[:50]:
-            html += f"""
+""")
+
+_ERROR_ROW = """
             <tr>
-                <td>{error['url'][:80]}...</td>
-                <td>{error['domain']}</td>
-                <td>{error['error'][:100]}</td>
+                <td class="truncate">{url}</td>
+                <td>{domain}</td>
+                <td class="truncate">{error}</td>
             </tr>
-"""
-        
-        html += """
+""".format
+
+_REPORT_FOOTER = """
         </table>
     </div>
 </body>
 </html>
 """
+
+
+def _json_bytes(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+@lru_cache(maxsize=65536)
+def _normalize_host(netloc: str) -> str:
+    return sys.intern(netloc.partition(":")[0] or "unknown")
+
+
+def _host_of(url: str) -> str:
+    match = _AUTHORITY(url)
+    if match is not None:
+        return _normalize_host(match.group(1))
+    try:
+        netloc = urlparse(url).netloc
+    except ValueError:
+        return "unknown"
+    return _normalize_host(netloc)
+
+
+class _DomainCounter:
+    __slots__ = ("domain", "pages", "successful", "failed")
+    
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.pages = 0
+        self.successful = 0
+        self.failed = 0
+    
+    def as_dict(self) -> Dict[str, int]:
+        return {"pages": self.pages, "successful": self.successful, "failed": self.failed}
+
+
+class CrawlerStats:
+    
+    def __init__(self, max_errors: int = 100):
+                           
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
         
+                  
+        self.total_pages = 0                            
+        self.successful = 0                     
+        self.failed = 0                      
+        self.blocked = 0                              
+        
+                                    
+        self._status = array("Q", bytes(_STATUS_SLOTS * 8))
+        self._status_overflow: Dict[int, int] = defaultdict(int)
+        
+                               
+        self._domains: Dict[str, _DomainCounter] = {}
+        
+                                               
+        self._total_page_time = 0.0
+        
+                
+        self._recent_errors: Deque[Tuple[str, str, str]] = deque(maxlen=max_errors)
+        self.errors_count = 0
+    
+    def start(self) -> None:
+        self.start_time = time.time()
+        logger.info("Crawler stats started")
+    
+    def stop(self) -> None:
+        self.end_time = time.time()
+        logger.info("Crawler stats stopped")
+    
+    def add_page(self, url: str, status: str, page_time: float, error: Optional[str] = None) -> None:
+        self.total_pages += 1
+        self._total_page_time += page_time
+        
+        domain = _host_of(url)
+        
+                                        
+        counter = self._domains.get(domain)
+        if counter is None:
+            counter = self._domains[domain] = _DomainCounter(domain)
+        counter.pages += 1
+        
+                                    
+        if status == "success":
+            self.successful += 1
+            counter.successful += 1
+        elif status == "failed":
+            self.failed += 1
+            counter.failed += 1
+            if error:
+                self._recent_errors.append((url, domain, error))
+                self.errors_count += 1
+        elif status == "blocked":
+            self.blocked += 1
+    
+    @property
+    def domain_stats(self) -> Dict[str, Dict[str, int]]:
+        return {domain: counter.as_dict() for domain, counter in self._domains.items()}
+    
+    @property
+    def status_codes(self) -> Dict[int, int]:
+        codes = {code: count for code, count in enumerate(self._status) if count}
+        codes.update(self._status_overflow)
+        return codes
+    
+    def add_status_code(self, status_code: int) -> None:
+        if 0 <= status_code < _STATUS_SLOTS:
+            self._status[status_code] += 1
+        else:
+            self._status_overflow[status_code] += 1
+    
+    def get_stats(self) -> Dict:
+        stats = self._summary()
+        stats["domains"] = self.domain_stats
+        return stats
+    
+    def _summary(self) -> Dict:
+        now = time.time() if self.end_time is None else self.end_time
+        elapsed_time = now - (self.start_time or now)
+        
+                                    
+        avg_speed = self.total_pages / elapsed_time if elapsed_time > 0 else 0
+        
+                                                    
+        avg_page_time = self._total_page_time / self.total_pages if self.total_pages else 0.0
+        
+                                           
+        top_domains = heapq.nlargest(10, self._domains.values(), key=_BY_PAGES)
+        
+        return {
+            "total_pages": self.total_pages,
+            "successful": self.successful,
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "status_codes": self.status_codes,
+            "top_domains": [{"domain": counter.domain, **counter.as_dict()} for counter in top_domains],
+            "performance": {
+                "elapsed_time": elapsed_time,
+                "avg_speed": avg_speed,                     
+                "avg_page_time": avg_page_time,                      
+                "total_time": self._total_page_time,
+            },
+            "errors_count": self.errors_count,
+        }
+    
+    async def export_to_json(self, filename: str) -> None:
+        await asyncio.to_thread(
+            self._write_json,
+            filename,
+            datetime.now().isoformat(),
+            self._summary(),
+            [(domain, counter.pages, counter.successful, counter.failed) for domain, counter in self._domains.items()],
+            [{"url": url, "error": error, "domain": domain} for url, domain, error in self._recent_errors],
+        )
+    
+    @staticmethod
+    def _write_json(
+        filename: str,
+        exported_at: str,
+        stats: Dict,
+        domains: List[Tuple[str, int, int, int]],
+        errors: List[Dict[str, str]],
+    ) -> None:
+        try:
+            with open(filename, "wb") as f:
+                f.write(b'{"exported_at": ' + _json_bytes(exported_at) + b', "stats": {')
+                for key, value in stats.items():
+                    f.write(_json_bytes(key) + b": " + _json_bytes(value) + b", ")
+                f.write(b'"domains": {')
+                separator = b""
+                for domain, pages, successful, failed in domains:
+                    counts = {"pages": pages, "successful": successful, "failed": failed}
+                    f.write(separator + _json_bytes(domain) + b": " + _json_bytes(counts))
+                    separator = b", "
+                f.write(b'}}, "errors": ' + _json_bytes(errors) + b"}")
+            logger.info(f"Stats exported to JSON: {filename}")
+        except Exception as e:
+            logger.error(f"Error exporting stats to JSON: {e}", exc_info=True)
+    
+    async def export_to_html_report(self, filename: str) -> None:
+        stats = self._summary()
+        errors = list(self._recent_errors)[-50:]
+        await asyncio.to_thread(self._render_and_write, filename, stats, errors)
+    
+    @classmethod
+    def _render_and_write(cls, filename: str, stats: Dict, errors: List[Tuple[str, str, str]]) -> None:
         try:
             with open(filename, "w", encoding="utf-8") as f:
-                f.write(html)
+                cls._write_html_report(f, stats, errors)
             logger.info(f"HTML report exported: {filename}")
         except Exception as e:
             logger.error(f"Error exporting HTML report: {e}", exc_info=True)
+    
+    @staticmethod
+    def _write_html_report(f: TextIO, stats: Dict, errors: List[Tuple[str, str, str]]) -> None:
+        performance = stats['performance']
+        f.write(_HTML_HEAD)
+        f.write(_REPORT_HEADER.substitute(
+            generated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            total_pages=stats['total_pages'],
+            successful=stats['successful'],
+            failed=stats['failed'],
+            blocked=stats['blocked'],
+            elapsed_time=f"{performance['elapsed_time']:.2f}",
+            avg_speed=f"{performance['avg_speed']:.2f}",
+            avg_page_time=f"{performance['avg_page_time']:.3f}",
+        ))
+        
+                                           
+        status_codes = sorted(stats['status_codes'].items())
+        total_with_status = sum(count for _, count in status_codes)
+        scale = 100 / total_with_status if total_with_status > 0 else 0
+        f.write("".join(
+            _STATUS_ROW(code=status_code, count=count, percentage=count * scale)
+            for status_code, count in status_codes
+        ))
+        
+        f.write(_DOMAINS_HEADER)
+        
+                               
+        f.write("".join(
+            _DOMAIN_ROW(
+                domain=escape(domain_info['domain']),
+                pages=domain_info['pages'],
+                successful=domain_info['successful'],
+                failed=domain_info['failed'],
+            )
+            for domain_info in stats['top_domains']
+        ))
+        
+        f.write(_ERRORS_HEADER.substitute(errors_count=stats['errors_count']))
+        
+                                    
+        f.write("".join(
+            _ERROR_ROW(url=escape(url), domain=escape(domain), error=escape(error))
+            for url, domain, error in errors
+        ))
+        
+        f.write(_REPORT_FOOTER)
+
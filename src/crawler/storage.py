@@ -1,18 +1,130 @@
 import asyncio
+import csv
+import io
 import json
 import logging
+import time
 from abc import ABC, abstractmethod
+from collections import deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Deque, Dict, List, Optional
 
-import aiofiles
 import aiosqlite
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
 logger = logging.getLogger(__name__)
 
+_CONTAINER = (list, dict)
+
+_MAX_BATCH_SIZE = 1024
+
+_MAX_PENDING_BATCHES = 4
+
+_DEFAULTS: Dict[str, Any] = {
+    "url": "",
+    "title": "",
+    "text": "",
+    "links": [],
+    "metadata": {},
+    "images": [],
+    "headings": [],
+    "tables": [],
+    "lists": [],
+    "status_code": 0,
+    "crawled_at": None,
+    "content_type": "text/html",
+}
+
+_MUTABLE_DEFAULTS = {key: type(value) for key, value in _DEFAULTS.items() if isinstance(value, _CONTAINER)}
+
+_json_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+_SQLITE_SCHEMA = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+    PRAGMA busy_timeout=5000;
+    CREATE TABLE IF NOT EXISTS pages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL UNIQUE,
+        title TEXT,
+        text TEXT,
+        links TEXT,  -- JSON строка со списком ссылок
+        metadata TEXT,  -- JSON строка с метаданными
+        images TEXT,  -- JSON строка со списком изображений
+        headings TEXT,  -- JSON строка со списком заголовков
+        tables TEXT,  -- JSON строка с таблицами
+        lists TEXT,  -- JSON строка со списками
+        status_code INTEGER,
+        content_type TEXT,
+        crawled_at TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    DROP INDEX IF EXISTS idx_url;
+    CREATE INDEX IF NOT EXISTS idx_crawled_at ON pages(crawled_at);
+    CREATE INDEX IF NOT EXISTS idx_status_code ON pages(status_code);
+"""
+
+_INSERT_SQL = (
+    "INSERT OR REPLACE INTO pages "
+    "(url, title, text, links, metadata, images, headings, tables, lists, status_code, content_type, crawled_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _json_text(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return _json_encode(value)
+
+
+def _json_line(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (_json_encode(value) + "\n").encode("utf-8")
+
+
+def _parquet_schema() -> "pa.Schema":
+    return pa.schema([
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("text", pa.string()),
+        ("links", pa.string()),
+        ("metadata", pa.string()),
+        ("images", pa.string()),
+        ("headings", pa.string()),
+        ("tables", pa.string()),
+        ("lists", pa.string()),
+        ("status_code", pa.int32()),
+        ("crawled_at", pa.string()),
+        ("content_type", pa.string()),
+    ])
+
 
 class DataStorage(ABC):
     
+    def __init__(self):
+        self.buffer: Deque[Any] = deque()
+        self._flush_task: Optional[asyncio.Task] = None
+    
     @abstractmethod
     async def save(self, data: Dict[str, Any]) -> None:
         pass
@@ -21,53 +133,106 @@ class DataStorage(ABC):
     async def close(self) -> None:
         pass
     
+    @abstractmethod
+    async def _flush_buffer(self) -> None:
+        pass
+    
+    async def _background_flush(self) -> None:
+        try:
+            await self._flush_buffer()
+        except Exception as e:
+            logger.error(f"Error in background flush for {type(self).__name__}: {e}", exc_info=True)
+    
+    async def _request_flush(self, threshold: int) -> None:
+        task = self._flush_task
+        if task is None or task.done():
+            self._flush_task = asyncio.create_task(self._background_flush())
+        elif len(self.buffer) >= threshold * _MAX_PENDING_BATCHES:
+            await asyncio.shield(task)
+    
+    async def _wait_for_flush(self) -> None:
+        task, self._flush_task = self._flush_task, None
+        if task is not None:
+            await task
+    
     def _normalize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-                                       
-        normalized = {
-            "url": data.get("url", ""),
-            "title": data.get("title", ""),
-            "text": data.get("text", ""),
-            "links": data.get("links", []),
-            "metadata": data.get("metadata", {}),
-            "images": data.get("images", []),
-            "headings": data.get("headings", []),
-            "tables": data.get("tables", []),
-            "lists": data.get("lists", []),
-                                                                                           
-            "status_code": data.get("status_code", data.get("status", 0)),
-            "crawled_at": data.get("crawled_at", datetime.now().isoformat()),
-            "content_type": data.get("content_type", "text/html"),
-        }
+        if data.keys() <= _DEFAULTS.keys():
+            normalized = {**_DEFAULTS, **data}
+        else:
+            normalized = {key: data.get(key, default) for key, default in _DEFAULTS.items()}
+            if "status_code" not in data:
+                normalized["status_code"] = data.get("status", 0)
+        for key, factory in _MUTABLE_DEFAULTS.items():
+            if key not in data:
+                normalized[key] = factory()
+        if normalized["crawled_at"] is None and "crawled_at" not in data:
+            normalized["crawled_at"] = datetime.now().isoformat()
         return normalized
+    
+    def _next_batch_size(self, current: int, minimum: int, flush_time: float, fill_time: float) -> int:
+        if flush_time < 0.5 * fill_time:
+            return min(current * 2, max(_MAX_BATCH_SIZE, minimum))
+        if flush_time > fill_time:
+            return max(current // 2, minimum)
+        return current
 
 
 class JSONStorage(DataStorage):
     
-    def __init__(self, filename: str, buffer_size: int = 10):
+    def __init__(self, filename: str, buffer_size: int = 10, output_format: str = "jsonl"):
+        super().__init__()
+        if output_format == "msgpack":
+            if msgpack is None:
+                raise ImportError("JSONStorage output_format 'msgpack' requires msgpack (pip install msgpack)")
+            self._encode = msgpack.Packer(use_bin_type=True).pack
+        elif output_format == "jsonl":
+            self._encode = _json_line
+        else:
+            raise ValueError(f"Unknown JSONStorage output_format: {output_format}")
         self.filename = filename
+        self.output_format = output_format
         self.buffer_size = buffer_size
-        self.buffer: List[Dict[str, Any]] = []                                
-        self.buffer_lock = asyncio.Lock()                                     
-        self.file_handle: Optional[aiofiles.threadpool.AsyncTextIOWrapper] = None
+        self.min_buffer_size = buffer_size
+        self.write_lock = asyncio.Lock()
+        self._flushed_at = time.monotonic()
+        self.file_handle: Optional[BinaryIO] = None
         self.total_saved = 0                               
     
+    def _append_sync(self, data: bytes) -> None:
+        if self.file_handle is None:
+            self.file_handle = open(self.filename, "ab")
+        self.file_handle.write(data)
+        self.file_handle.flush()
+    
+    def _close_sync(self) -> None:
+        if self.file_handle is not None:
+            self.file_handle.close()
+            self.file_handle = None
+    
     async def _flush_buffer(self) -> None:
         if not self.buffer:
             return
         
-        async with self.buffer_lock:
-                                                                 
-            async with aiofiles.open(self.filename, "a", encoding="utf-8") as f:
-                                                                    
-                for item in self.buffer:
-                    json_line = json.dumps(item, ensure_ascii=False) + "\n"
-                    await f.write(json_line)
+        async with self.write_lock:
+            batch, self.buffer = self.buffer, deque()
+            if not batch:
+                return
             
-                                        
-            saved_count = len(self.buffer)
-            self.buffer.clear()
-            self.total_saved += saved_count
-            logger.debug(f"Flushed {saved_count} records to {self.filename}")
+            started = time.monotonic()
+            try:
+                payload = b"".join(map(self._encode, batch))
+                await asyncio.to_thread(self._append_sync, payload)
+            except Exception:
+                self.buffer.extendleft(reversed(batch))
+                raise
+            
+            self.total_saved += len(batch)
+            finished = time.monotonic()
+            self.buffer_size = self._next_batch_size(
+                self.buffer_size, self.min_buffer_size, finished - started, started - self._flushed_at
+            )
+            self._flushed_at = finished
+            logger.debug(f"Flushed {len(batch)} records to {self.filename}")
     
     async def save(self, data: Dict[str, Any]) -> None:
         try:
@@ -75,12 +240,11 @@ class JSONStorage(DataStorage):
             normalized = self._normalize_data(data)
             
                                
-            async with self.buffer_lock:
-                self.buffer.append(normalized)
+            self.buffer.append(normalized)
             
                                                      
             if len(self.buffer) >= self.buffer_size:
-                await self._flush_buffer()
+                await self._request_flush(self.buffer_size)
         
         except Exception as e:
                                                               
@@ -88,84 +252,88 @@ class JSONStorage(DataStorage):
     
     async def close(self) -> None:
                                                 
-        await self._flush_buffer()
+        try:
+            await self._wait_for_flush()
+            await self._flush_buffer()
+        finally:
+            await asyncio.to_thread(self._close_sync)
         logger.info(f"JSONStorage closed. Total saved: {self.total_saved} records to {self.filename}")
 
 
 class CSVStorage(DataStorage):
     
     def __init__(self, filename: str, buffer_size: int = 10):
+        super().__init__()
         self.filename = filename
         self.buffer_size = buffer_size
-        self.buffer: List[Dict[str, Any]] = []
-        self.buffer_lock = asyncio.Lock()
+        self.min_buffer_size = buffer_size
+        self.write_lock = asyncio.Lock()
+        self._flushed_at = time.monotonic()
         self.headers: Optional[List[str]] = None                                              
         self.total_saved = 0
     
     def _flatten_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        flattened = {}
-        for key, value in data.items():
-            if isinstance(value, (list, dict)):
-                                                            
-                flattened[key] = json.dumps(value, ensure_ascii=False)
-            else:
-                flattened[key] = value
-        return flattened
+        dumps = _json_text
+        return {
+            key: dumps(value) if isinstance(value, _CONTAINER) else value
+            for key, value in data.items()
+        }
+    
+    def _append_sync(self, data: bytes, mode: str = "ab") -> None:
+        with open(self.filename, mode) as f:
+            f.write(data)
     
     async def _flush_buffer(self) -> None:
         if not self.buffer:
             return
         
-        async with self.buffer_lock:
-                                                                             
-            if self.headers is None and self.buffer:
+        async with self.write_lock:
+            batch, self.buffer = self.buffer, deque()
+            if not batch:
+                return
+            
+            started = time.monotonic()
+            sio = io.StringIO()
+            writer = csv.writer(sio)
+            mode = "ab"
+            headers = self.headers
+            flats = [self._flatten_data(item) for item in batch]
+            if headers is None:
                                                     
-                first_item = self._flatten_data(self.buffer[0])
-                self.headers = list(first_item.keys())
-                
-                                                              
-                async with aiofiles.open(self.filename, "w", encoding="utf-8", newline="") as f:
-                                          
-                    await f.write(",".join(self.headers) + "\n")
+                headers = list(flats[0].keys())
+                writer.writerow(headers)
+                mode = "wb"
             
-                                            
-            async with aiofiles.open(self.filename, "a", encoding="utf-8", newline="") as f:
-                                          
-                for item in self.buffer:
-                    flattened = self._flatten_data(item)
-                                                                                       
-                    row_values = []
-                    for header in self.headers:
-                        value = flattened.get(header, "")
-                                                                
-                        if value is None:
-                            value = ""
-                        value_str = str(value)
-                                                                                                   
-                        if "," in value_str or '"' in value_str or "\n" in value_str or "\r" in value_str:
-                            value_str = '"' + value_str.replace('"', '""') + '"'
-                        row_values.append(value_str)
-                    csv_line = ",".join(row_values) + "\n"
-                    await f.write(csv_line)
+            writer.writerows([[flat.get(header, "") for header in headers] for flat in flats])
             
-            saved_count = len(self.buffer)
-            self.buffer.clear()
-            self.total_saved += saved_count
-            logger.debug(f"Flushed {saved_count} records to CSV {self.filename}")
+            try:
+                await asyncio.to_thread(self._append_sync, sio.getvalue().encode("utf-8"), mode)
+            except Exception:
+                self.buffer.extendleft(reversed(batch))
+                raise
+            
+            self.headers = headers
+            self.total_saved += len(batch)
+            finished = time.monotonic()
+            self.buffer_size = self._next_batch_size(
+                self.buffer_size, self.min_buffer_size, finished - started, started - self._flushed_at
+            )
+            self._flushed_at = finished
+            logger.debug(f"Flushed {len(batch)} records to CSV {self.filename}")
     
     async def save(self, data: Dict[str, Any]) -> None:
         try:
             normalized = self._normalize_data(data)
-            async with self.buffer_lock:
-                self.buffer.append(normalized)
+            self.buffer.append(normalized)
             
             if len(self.buffer) >= self.buffer_size:
-                await self._flush_buffer()
+                await self._request_flush(self.buffer_size)
         
         except Exception as e:
             logger.error(f"Error saving to CSV: {e}", exc_info=True)
     
     async def close(self) -> None:
+        await self._wait_for_flush()
         await self._flush_buffer()
         logger.info(f"CSVStorage closed. Total saved: {self.total_saved} records to {self.filename}")
 
@@ -173,48 +341,24 @@ class CSVStorage(DataStorage):
 class SQLiteStorage(DataStorage):
     
     def __init__(self, db_path: str, batch_size: int = 50):
+        super().__init__()
         self.db_path = db_path
         self.batch_size = batch_size
-        self.buffer: List[Dict[str, Any]] = []
-        self.buffer_lock = asyncio.Lock()
+        self.min_batch_size = batch_size
+        self.write_lock = asyncio.Lock()
+        self._flushed_at = time.monotonic()
         self.db: Optional[aiosqlite.Connection] = None
         self.total_saved = 0
         self._initialized = False
+        self._db_closed = False
     
     async def init_db(self) -> None:
         if self._initialized:
             return
         
                                              
-        self.db = await aiosqlite.connect(self.db_path)
-        
-                                     
-        await self.db.execute("""
-            CREATE TABLE IF NOT EXISTS pages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT NOT NULL UNIQUE,
-                title TEXT,
-                text TEXT,
-                links TEXT,  -- JSON строка со списком ссылок
-                metadata TEXT,  -- JSON строка с метаданными
-                images TEXT,  -- JSON строка со списком изображений
-                headings TEXT,  -- JSON строка со списком заголовков
-                tables TEXT,  -- JSON строка с таблицами
-                lists TEXT,  -- JSON строка со списками
-                status_code INTEGER,
-                content_type TEXT,
-                crawled_at TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-                                             
-        await self.db.execute("CREATE INDEX IF NOT EXISTS idx_url ON pages(url)")
-        await self.db.execute("CREATE INDEX IF NOT EXISTS idx_crawled_at ON pages(crawled_at)")
-        await self.db.execute("CREATE INDEX IF NOT EXISTS idx_status_code ON pages(status_code)")
-        
-                             
-        await self.db.commit()
+        self.db = await aiosqlite.connect(self.db_path, isolation_level=None)
+        await self.db.executescript(_SQLITE_SCHEMA)
         self._initialized = True
         logger.info(f"SQLite database initialized: {self.db_path}")
     
@@ -226,68 +370,72 @@ class SQLiteStorage(DataStorage):
         if not self._initialized:
             await self.init_db()
         
-        async with self.buffer_lock:
+        async with self.write_lock:
+            batch, self.buffer = self.buffer, deque()
+            if not batch:
+                return
+            
+            started = time.monotonic()
             try:
-                                                   
-                insert_data = []
-                for item in self.buffer:
-                    normalized = self._normalize_data(item)
-                                                                
-                    insert_data.append((
-                        normalized["url"],
-                        normalized["title"],
-                        normalized["text"],
-                        json.dumps(normalized["links"], ensure_ascii=False),
-                        json.dumps(normalized["metadata"], ensure_ascii=False),
-                        json.dumps(normalized["images"], ensure_ascii=False),
-                        json.dumps(normalized["headings"], ensure_ascii=False),
-                        json.dumps(normalized["tables"], ensure_ascii=False),
-                        json.dumps(normalized["lists"], ensure_ascii=False),
-                        normalized["status_code"],
-                        normalized["content_type"],
-                        normalized["crawled_at"],
-                    ))
+                insert_data = {row[0]: row for row in batch}.values()
                 
-                                                                                                 
-                await self.db.executemany("""
-                    INSERT OR REPLACE INTO pages 
-                    (url, title, text, links, metadata, images, headings, tables, lists, status_code, content_type, crawled_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, insert_data)
+                await self.db.execute("BEGIN IMMEDIATE")
+                try:
+                    await self.db.executemany(_INSERT_SQL, insert_data)
+                    await self.db.commit()
+                except BaseException:
+                    await self.db.rollback()
+                    raise
                 
-                                     
-                await self.db.commit()
-                
-                saved_count = len(self.buffer)
-                self.buffer.clear()
-                self.total_saved += saved_count
-                logger.debug(f"Flushed {saved_count} records to SQLite {self.db_path}")
+                self.total_saved += len(insert_data)
+                finished = time.monotonic()
+                self.batch_size = self._next_batch_size(
+                    self.batch_size, self.min_batch_size, finished - started, started - self._flushed_at
+                )
+                self._flushed_at = finished
+                logger.debug(f"Flushed {len(insert_data)} records to SQLite {self.db_path}")
             
             except Exception as e:
                                                   
-                await self.db.rollback()
+                self.buffer.extendleft(reversed(batch))
                 logger.error(f"Error flushing to SQLite: {e}", exc_info=True)
                 raise
     
     async def save(self, data: Dict[str, Any]) -> None:
         try:
-            async with self.buffer_lock:
-                self.buffer.append(data)
+            normalized = self._normalize_data(data)
+            dumps = _json_text
+            self.buffer.append((
+                normalized["url"],
+                normalized["title"],
+                normalized["text"],
+                dumps(normalized["links"]),
+                dumps(normalized["metadata"]),
+                dumps(normalized["images"]),
+                dumps(normalized["headings"]),
+                dumps(normalized["tables"]),
+                dumps(normalized["lists"]),
+                normalized["status_code"],
+                normalized["content_type"],
+                normalized["crawled_at"],
+            ))
             
                                                   
             if len(self.buffer) >= self.batch_size:
-                await self._flush_buffer()
+                await self._request_flush(self.batch_size)
         
         except Exception as e:
             logger.error(f"Error saving to SQLite: {e}", exc_info=True)
     
     async def close(self) -> None:
                                       
+        await self._wait_for_flush()
         await self._flush_buffer()
         
                               
         if self.db:
             await self.db.close()
+            self._db_closed = True
             logger.info(f"SQLiteStorage closed. Total saved: {self.total_saved} records to {self.db_path}")
     
     async def get_stats(self) -> Dict[str, Any]:
@@ -296,17 +444,7 @@ class SQLiteStorage(DataStorage):
             return {"total": 0}
         
                                                     
-        need_reopen = False
-        if not self.db:
-            need_reopen = True
-        else:
-                                                 
-            try:
-                                                                          
-                await self.db.execute("SELECT 1")
-            except (ValueError, AttributeError):
-                                                       
-                need_reopen = True
+        need_reopen = self.db is None or self._db_closed
         
                                                       
         temp_db = None
@@ -321,20 +459,13 @@ class SQLiteStorage(DataStorage):
         db_to_use = temp_db if need_reopen else self.db
         
         try:
-                                      
-            cursor = await db_to_use.execute("SELECT COUNT(*) FROM pages")
-            total = (await cursor.fetchone())[0]
-            
-                                    
-            cursor = await db_to_use.execute("""
-                SELECT status_code, COUNT(*) 
-                FROM pages 
-                GROUP BY status_code
-            """)
-            status_counts = {row[0]: row[1] for row in await cursor.fetchall()}
+            rows = await db_to_use.execute_fetchall(
+                "SELECT status_code, COUNT(*) FROM pages GROUP BY status_code"
+            )
+            status_counts = {row[0]: row[1] for row in rows}
             
             return {
-                "total": total,
+                "total": sum(status_counts.values()),
                 "by_status": status_counts,
             }
         except Exception as e:
@@ -344,3 +475,79 @@ class SQLiteStorage(DataStorage):
                                                            
             if need_reopen and temp_db:
                 await temp_db.close()
+
+
+class ParquetStorage(DataStorage):
+    
+    def __init__(self, filename: str, buffer_size: int = 1000):
+        if pa is None:
+            raise ImportError("ParquetStorage requires pyarrow (pip install pyarrow)")
+        super().__init__()
+        self.filename = filename
+        self.buffer_size = buffer_size
+        self.min_buffer_size = buffer_size
+        self.write_lock = asyncio.Lock()
+        self._flushed_at = time.monotonic()
+        self.writer: Optional["pq.ParquetWriter"] = None
+        self.total_saved = 0
+    
+    def _write_sync(self, rows: List[Dict[str, Any]]) -> None:
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.filename, _parquet_schema(), compression="zstd")
+        self.writer.write_table(pa.Table.from_pylist(rows, schema=self.writer.schema))
+    
+    def _close_sync(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+    
+    async def _flush_buffer(self) -> None:
+        if not self.buffer:
+            return
+        
+        async with self.write_lock:
+            batch, self.buffer = self.buffer, deque()
+            if not batch:
+                return
+            
+            started = time.monotonic()
+            try:
+                dumps = _json_text
+                rows = [
+                    {
+                        key: dumps(value) if isinstance(value, _CONTAINER) else value
+                        for key, value in item.items()
+                    }
+                    for item in batch
+                ]
+                await asyncio.to_thread(self._write_sync, rows)
+            except Exception:
+                self.buffer.extendleft(reversed(batch))
+                raise
+            
+            self.total_saved += len(batch)
+            finished = time.monotonic()
+            self.buffer_size = self._next_batch_size(
+                self.buffer_size, self.min_buffer_size, finished - started, started - self._flushed_at
+            )
+            self._flushed_at = finished
+            logger.debug(f"Flushed {len(batch)} records to Parquet {self.filename}")
+    
+    async def save(self, data: Dict[str, Any]) -> None:
+        try:
+            normalized = self._normalize_data(data)
+            self.buffer.append(normalized)
+            
+            if len(self.buffer) >= self.buffer_size:
+                await self._request_flush(self.buffer_size)
+        
+        except Exception as e:
+            logger.error(f"Error saving to Parquet: {e}", exc_info=True)
+    
+    async def close(self) -> None:
+        try:
+            await self._wait_for_flush()
+            await self._flush_buffer()
+        finally:
+            await asyncio.to_thread(self._close_sync)
+        logger.info(f"ParquetStorage closed. Total saved: {self.total_saved} records to {self.filename}")
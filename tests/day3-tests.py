@@ -93,6 +93,19 @@ async def test_queue_mark_processed_and_failed():
     print("PASS: Mark processed and failed work correctly")
 
 
+async def test_queue_domain_precomputed():
+    print("\n=== Test: Queue Domain Precomputed ===")
+    
+    queue = CrawlerQueue()
+    queue.add_url("http://Example.com:8080/page")
+    
+    entry = await queue.get_next_with_domain()
+    assert entry == ("http://Example.com:8080/page", "example.com"), f"Unexpected entry: {entry}"
+    assert await queue.get_next_with_domain() is None, "Queue should be empty"
+    
+    print("PASS: Domain is computed once at enqueue time")
+
+
 async def test_semaphore_manager():
     print("\n=== Test: Semaphore Manager ===")
     
@@ -253,6 +266,7 @@ async def main():
     await test_queue_priorities()
     await test_queue_no_duplicates()
     await test_queue_mark_processed_and_failed()
+    await test_queue_domain_precomputed()
     await test_semaphore_manager()
     await test_crawler_max_depth()
     await test_crawler_url_filtering()
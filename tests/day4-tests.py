@@ -4,6 +4,7 @@ import time
                                                                      
 from crawler.rate_limiter import RateLimiter, RobotsParser
 from crawler.fetcher import AsyncCrawler
+from crawler.session import close_shared_session, get_shared_session
 
 
 async def test_rate_limiter_single_domain():
@@ -32,6 +33,15 @@ async def test_rate_limiter_multi_domain():
     print("PASS: rate limiting multi domain")
 
 
+async def test_rate_limiter_concurrent_same_domain():
+    limiter = RateLimiter(requests_per_second=2.0, per_domain=True)
+    t0 = time.time()
+    await asyncio.gather(*(limiter.acquire("example.com") for _ in range(3)))
+    elapsed = time.time() - t0
+    assert elapsed >= 0.9, f"Concurrent waiters were not spaced out: {elapsed:.2f}s"
+    print("PASS: rate limiting concurrent waiters on one domain")
+
+
 async def test_robots_parser_can_fetch_and_delay():
     parser = RobotsParser(user_agent="TestBot")
 
@@ -50,7 +60,7 @@ async def test_robots_parser_can_fetch_and_delay():
         ]
     )
     domain = "example.com"
-    parser._cache[domain] = rp                                    
+    parser._cache[domain] = (rp, time.monotonic())                                    
 
                
     allowed = await parser.can_fetch("https://example.com/public", session=None, user_agent="TestBot")
@@ -64,6 +74,126 @@ async def test_robots_parser_can_fetch_and_delay():
     print("PASS: robots parser can_fetch & crawl-delay")
 
 
+async def test_robots_parser_fetches_once_per_domain():
+    class FakeResponse:
+        status = 200
+
+        async def __aenter__(self):
+            await asyncio.sleep(0.05)
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+        async def text(self):
+            return "User-agent: *\nDisallow: /private"
+
+    class FakeSession:
+        def __init__(self):
+            self.calls = 0
+
+        def get(self, url):
+            self.calls += 1
+            return FakeResponse()
+
+    parser = RobotsParser(user_agent="TestBot")
+    session = FakeSession()
+    results = await asyncio.gather(
+        *(parser.can_fetch("https://example.com/private/x", session) for _ in range(5))
+    )
+    assert results == [False] * 5
+    assert session.calls == 1, f"Expected a single robots.txt fetch, got {session.calls}"
+    print("PASS: robots.txt fetched once per domain")
+
+
+async def test_robots_parser_negative_cache():
+    class MissingResponse:
+        status = 404
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    class FakeSession:
+        def __init__(self):
+            self.calls = 0
+
+        def get(self, url):
+            self.calls += 1
+            return MissingResponse()
+
+    parser = RobotsParser(user_agent="TestBot", negative_ttl=60.0)
+    session = FakeSession()
+    assert await parser.can_fetch("https://example.com/a", session) is True
+    assert await parser.can_fetch("https://example.com/b", session) is True
+    assert session.calls == 1, f"Missing robots.txt should be cached, got {session.calls} fetches"
+
+    parser.negative_ttl = 0.0
+    await parser.can_fetch("https://example.com/c", session)
+    assert session.calls == 2, "Expired negative entry should trigger a refetch"
+    print("PASS: missing robots.txt is negatively cached")
+
+
+async def test_robots_parser_owner_cancelled():
+    class SlowResponse:
+        status = 200
+
+        async def __aenter__(self):
+            await asyncio.sleep(0.05)
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+        async def text(self):
+            return "User-agent: *\nDisallow: /private"
+
+    class FakeSession:
+        def __init__(self):
+            self.calls = 0
+
+        def get(self, url):
+            self.calls += 1
+            return SlowResponse()
+
+    parser = RobotsParser(user_agent="TestBot")
+    session = FakeSession()
+    owner = asyncio.create_task(parser.fetch_robots("https://example.com", session))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(parser.can_fetch("https://example.com/private/x", session))
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    assert await waiter is False, "Waiter should fetch robots.txt itself after the owner is cancelled"
+    assert not waiter.cancelled()
+    assert session.calls == 2, f"Expected a refetch by the waiter, got {session.calls} fetches"
+    print("PASS: cancelled robots.txt fetch does not cancel waiters")
+
+
+async def test_shared_session_per_loop():
+    async def open_in_own_loop():
+        session = get_shared_session()
+        assert get_shared_session() is session
+        await close_shared_session()
+        return session
+
+    first = await asyncio.to_thread(asyncio.run, open_in_own_loop())
+    second = await asyncio.to_thread(asyncio.run, open_in_own_loop())
+    assert first is not second, "Shared session must not be reused across event loops"
+    assert first.closed and second.closed
+
+    session = get_shared_session()
+    assert session is not first and not session.closed
+    await close_shared_session()
+    assert session.closed
+
+    parser = RobotsParser(user_agent="TestBot")
+    assert await parser.fetch_robots("https://example.com/", None) is None
+    print("PASS: shared session is scoped to its event loop")
+
+
 async def test_crawler_respects_robots_block():
     crawler = AsyncCrawler(respect_robots=True, verify_ssl=False)
 
@@ -72,7 +202,7 @@ async def test_crawler_respects_robots_block():
 
     rp = RobotFileParser()
     rp.parse(["User-agent: *", "Disallow: /"])
-    crawler.robots_parser._cache[crawler._get_domain("https://example.com")] = rp
+    crawler.robots_parser._cache[crawler._get_domain("https://example.com")] = (rp, time.monotonic())
 
     allowed = await crawler._is_allowed_by_robots("https://example.com/allowed")
     assert allowed is False, "URL должен быть заблокирован"
@@ -84,7 +214,12 @@ async def test_crawler_respects_robots_block():
 async def main():
     await test_rate_limiter_single_domain()
     await test_rate_limiter_multi_domain()
+    await test_rate_limiter_concurrent_same_domain()
     await test_robots_parser_can_fetch_and_delay()
+    await test_robots_parser_fetches_once_per_domain()
+    await test_robots_parser_negative_cache()
+    await test_robots_parser_owner_cancelled()
+    await test_shared_session_per_loop()
     await test_crawler_respects_robots_block()
     print("\n=== ALL DAY 4 TESTS PASSED ===")
 
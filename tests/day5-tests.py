@@ -59,7 +59,8 @@ async def test_backoff_delays_count():
                                                                       
     assert len(retry.retry_delays) == retry.max_retries, "Backoff delays should be recorded for each retry"
                                                                       
-    for prev, nxt in zip(retry.retry_delays, retry.retry_delays[1:]):
+    delays = list(retry.retry_delays)
+    for prev, nxt in zip(delays, delays[1:]):
         assert nxt >= prev, "Backoff delays should be non-decreasing"
     print("PASS: backoff delays recorded and non-decreasing")
 
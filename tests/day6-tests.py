@@ -1,10 +1,12 @@
 import asyncio
+import csv
 import json
 import os
 import sqlite3
+import time
 from datetime import datetime
 
-from crawler.storage import JSONStorage, CSVStorage, SQLiteStorage
+from crawler.storage import DataStorage, JSONStorage, CSVStorage, SQLiteStorage, ParquetStorage
 
 
 async def test_json_storage():
@@ -94,6 +96,11 @@ async def test_csv_storage():
         assert "url" in headers, "Should have url header"
         assert "title" in headers, "Should have title header"
     
+    with open(test_file, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+        assert len(rows) == 1, f"Should have 1 data row, got {len(rows)}"
+        assert rows[0]["text"] == test_data["text"], "Quoted field should round-trip"
+    
     os.remove(test_file)
     print("PASS: CSV storage works correctly")
 
@@ -143,13 +150,25 @@ async def test_sqlite_storage():
     assert row[1] == test_data["title"], "Title should match"
     assert row[2] == test_data["status_code"], "Status code should match"
     
+    cursor.execute("SELECT links, metadata FROM pages WHERE url = ?", (test_data["url"],))
+    links, metadata = cursor.fetchone()
+    assert json.loads(links) == test_data["links"], "Links should round-trip as JSON"
+    assert json.loads(metadata) == test_data["metadata"], "Metadata should round-trip as JSON"
+    
                        
     cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
     indexes = [row[0] for row in cursor.fetchall()]
-    assert "idx_url" in indexes, "Should have url index"
+    assert "sqlite_autoindex_pages_1" in indexes, "Should have the implicit unique url index"
+    assert "idx_url" not in indexes, "Should not duplicate the unique url index"
+    assert "idx_status_code" in indexes, "Should have status_code index"
+    
+    cursor.execute("PRAGMA journal_mode")
+    assert cursor.fetchone()[0] == "wal", "Database should use WAL journaling"
     
     conn.close()
-    os.remove(test_db)
+    for path in (test_db, test_db + "-wal", test_db + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
     print("PASS: SQLite storage works correctly")
 
 
@@ -261,6 +280,221 @@ async def test_sqlite_stats():
     print("PASS: SQLite stats work correctly")
 
 
+async def test_json_storage_concurrent_saves():
+    print("\n=== Test: JSON Storage Concurrent Saves ===")
+    
+    test_file = "test_concurrent.json"
+    if os.path.exists(test_file):
+        os.remove(test_file)
+    
+    storage = JSONStorage(test_file, buffer_size=3)
+    
+    await asyncio.gather(*(
+        storage.save({"url": f"https://example.com/page{i}", "title": f"Page {i}"})
+        for i in range(20)
+    ))
+    await storage.close()
+    
+    with open(test_file, "r", encoding="utf-8") as f:
+        urls = [json.loads(line)["url"] for line in f]
+    
+    assert urls == [f"https://example.com/page{i}" for i in range(20)], "All records should be written in order"
+    assert storage.total_saved == 20, f"Should count 20 records, got {storage.total_saved}"
+    
+    os.remove(test_file)
+    print("PASS: Concurrent saves are flushed completely and in order")
+
+
+async def test_json_storage_failed_flush_order():
+    print("\n=== Test: JSON Storage Failed Flush Order ===")
+    
+    test_file = "test_retry.json"
+    if os.path.exists(test_file):
+        os.remove(test_file)
+    
+    storage = JSONStorage(test_file, buffer_size=100)
+    append = storage._append_sync
+    failures = [OSError("disk full")]
+    
+    def flaky_append(data):
+        time.sleep(0.05)
+        if failures:
+            raise failures.pop()
+        append(data)
+    
+    storage._append_sync = flaky_append
+    for i in range(2):
+        await storage.save({"url": f"https://example.com/page{i}"})
+    first = asyncio.create_task(storage._flush_buffer())
+    await asyncio.sleep(0.01)
+    await storage.save({"url": "https://example.com/page2"})
+    second = asyncio.create_task(storage._flush_buffer())
+    results = await asyncio.gather(first, second, return_exceptions=True)
+    await storage.close()
+    
+    with open(test_file, "r", encoding="utf-8") as f:
+        urls = [json.loads(line)["url"] for line in f]
+    
+    assert isinstance(results[0], OSError), f"First flush should fail: {results}"
+    assert urls == [f"https://example.com/page{i}" for i in range(3)], f"Failed batch should be written before newer records: {urls}"
+    
+    os.remove(test_file)
+    print("PASS: Failed batches keep their place in line")
+
+
+async def test_storage_base_state():
+    print("\n=== Test: Storage Base State ===")
+    
+    class MemoryStorage(DataStorage):
+        def __init__(self):
+            super().__init__()
+            self.flushed = []
+        
+        async def save(self, data):
+            self.buffer.append(self._normalize_data(data))
+            await self._request_flush(1)
+        
+        async def close(self):
+            await self._wait_for_flush()
+            await self._flush_buffer()
+        
+        async def _flush_buffer(self):
+            self.flushed.extend(self.buffer)
+            self.buffer.clear()
+    
+    storage = MemoryStorage()
+    await storage.save({"url": "https://example.com"})
+    await storage.close()
+    
+    assert [r["url"] for r in storage.flushed] == ["https://example.com"], f"Unexpected records: {storage.flushed}"
+    assert "_flush_task" not in vars(DataStorage), "Flush task should be per instance"
+    
+    print("PASS: DataStorage initializes shared buffer state")
+
+
+async def test_adaptive_batch_size():
+    print("\n=== Test: Adaptive Batch Size ===")
+    
+    storage = JSONStorage("unused.json", buffer_size=4)
+    
+    assert storage._next_batch_size(4, 4, 0.01, 1.0) == 8, "Fast flushes should grow the batch"
+    assert storage._next_batch_size(1024, 4, 0.01, 1.0) == 1024, "Growth should stop at the cap"
+    assert storage._next_batch_size(16, 4, 2.0, 1.0) == 8, "Slow flushes should shrink the batch"
+    assert storage._next_batch_size(4, 4, 2.0, 1.0) == 4, "Shrinking should stop at the configured size"
+    assert storage._next_batch_size(8, 4, 0.7, 1.0) == 8, "Balanced flushes should keep the batch"
+    
+    print("PASS: Batch size adapts to flush latency")
+
+
+async def test_normalize_data():
+    print("\n=== Test: Normalize Data ===")
+    
+    storage = JSONStorage("unused.json")
+    
+    plain = storage._normalize_data({"url": "https://example.com", "title": "T"})
+    legacy = storage._normalize_data({"url": "https://example.com", "status": 404, "html": "<p>"})
+    
+    assert list(plain) == list(legacy), "Normalized records should share one key order"
+    assert "html" not in legacy, "Unknown fields should be dropped"
+    assert legacy["status_code"] == 404, "Legacy status should map to status_code"
+    assert plain["status_code"] == 0 and plain["links"] == [], "Missing fields should get defaults"
+    assert plain["crawled_at"], "Missing crawled_at should be filled in"
+    
+    plain["links"].append("https://example.com/leak")
+    plain["metadata"]["leak"] = True
+    fresh = storage._normalize_data({"url": "https://example.com/other"})
+    assert fresh["links"] == [] and fresh["metadata"] == {}, "Default containers should not be shared between records"
+    assert legacy["links"] == [], "Default containers should not be shared between records"
+    
+    print("PASS: Records are normalized consistently")
+
+
+async def test_parquet_storage():
+    print("\n=== Test: Parquet Storage ===")
+    
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("SKIP: pyarrow is not installed")
+        return
+    
+    test_file = "test_output.parquet"
+    if os.path.exists(test_file):
+        os.remove(test_file)
+    
+    storage = ParquetStorage(test_file, buffer_size=2)
+    for i in range(3):
+        await storage.save({
+            "url": f"https://example.com/page{i}",
+            "title": f"Page {i}",
+            "links": [f"https://example.com/link{i}"],
+            "status_code": 200,
+        })
+    await storage.close()
+    
+    table = pq.read_table(test_file)
+    assert table.num_rows == 3, f"Should have 3 rows, got {table.num_rows}"
+    assert table.column("url").to_pylist()[2] == "https://example.com/page2", "URL should match"
+    assert json.loads(table.column("links").to_pylist()[0]) == ["https://example.com/link0"], "Links should be JSON"
+    
+    os.remove(test_file)
+    print("PASS: Parquet storage works correctly")
+
+
+async def test_sqlite_dedupes_batch():
+    print("\n=== Test: SQLite Batch Dedupe ===")
+    
+    test_db = "test_dedupe.db"
+    if os.path.exists(test_db):
+        os.remove(test_db)
+    
+    storage = SQLiteStorage(test_db, batch_size=10)
+    await storage.init_db()
+    await storage.save({"url": "https://example.com/a", "title": "Old"})
+    await storage.save({"url": "https://example.com/b", "title": "B"})
+    await storage.save({"url": "https://example.com/a", "title": "New"})
+    await storage.close()
+    
+    conn = sqlite3.connect(test_db)
+    rows = dict(conn.execute("SELECT url, title FROM pages").fetchall())
+    conn.close()
+    
+    assert len(rows) == 2, f"Should have 2 rows, got {len(rows)}"
+    assert rows["https://example.com/a"] == "New", "Last record for a URL should win"
+    assert storage.total_saved == 2, f"Deduplicated rows should not be counted, got {storage.total_saved}"
+    
+    os.remove(test_db)
+    print("PASS: Duplicate URLs in a batch are written once")
+
+
+async def test_json_storage_msgpack():
+    print("\n=== Test: JSON Storage MessagePack ===")
+    
+    try:
+        import msgpack
+    except ImportError:
+        print("SKIP: msgpack is not installed")
+        return
+    
+    test_file = "test_output.msgpack"
+    if os.path.exists(test_file):
+        os.remove(test_file)
+    
+    storage = JSONStorage(test_file, buffer_size=2, output_format="msgpack")
+    for i in range(3):
+        await storage.save({"url": f"https://example.com/page{i}", "links": [f"https://example.com/link{i}"]})
+    await storage.close()
+    
+    with open(test_file, "rb") as f:
+        records = list(msgpack.Unpacker(f, raw=False))
+    
+    assert [r["url"] for r in records] == [f"https://example.com/page{i}" for i in range(3)], "Records should round-trip"
+    assert records[1]["links"] == ["https://example.com/link1"], "Nested fields should round-trip"
+    
+    os.remove(test_file)
+    print("PASS: MessagePack output works correctly")
+
+
 async def main():
     print("=== Running Day 6 Tests ===")
     
@@ -270,6 +504,14 @@ async def main():
     await test_storage_error_handling()
     await test_storage_data_integrity()
     await test_sqlite_stats()
+    await test_json_storage_concurrent_saves()
+    await test_json_storage_failed_flush_order()
+    await test_storage_base_state()
+    await test_adaptive_batch_size()
+    await test_normalize_data()
+    await test_parquet_storage()
+    await test_sqlite_dedupes_batch()
+    await test_json_storage_msgpack()
     
     print("\n=== ALL DAY 6 TESTS PASSED ===")
 
@@ -1,4 +1,6 @@
 import asyncio
+import gzip
+import json
 import os
 import tempfile
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -9,6 +11,41 @@ from crawler.stats import CrawlerStats
 from crawler.advanced_crawler import AdvancedCrawler
 
 
+class FakeContent:
+    def __init__(self, data: bytes, chunk_size: int = 0):
+        self._data = data
+        self._chunk_size = chunk_size
+
+    async def iter_chunked(self, size: int):
+        size = self._chunk_size or size
+        for i in range(0, len(self._data), size):
+            yield self._data[i:i + size]
+
+
+class FakeResponse:
+    def __init__(self, text: str, status: int = 200, chunk_size: int = 0):
+        self._text = text
+        self.status = status
+        self.headers = {}
+        self.content = FakeContent(text.encode("utf-8") if isinstance(text, str) else text, chunk_size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def text(self, encoding=None):
+        return self._text
+
+    async def read(self):
+        return self._text.encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise Exception(f"HTTP {self.status}")
+
+
 async def test_sitemap_parser():
     print("\n=== Test: Sitemap Parser ===")
     
@@ -23,25 +60,6 @@ async def test_sitemap_parser():
     </url>
 </urlset>"""
 
-    class FakeResponse:
-        def __init__(self, text: str, status: int = 200):
-            self._text = text
-            self.status = status
-            self.headers = {}
-
-        async def __aenter__(self):
-            return self
-
-        async def __aexit__(self, exc_type, exc, tb):
-            return False
-
-        async def text(self, encoding=None):
-            return self._text
-
-        def raise_for_status(self):
-            if self.status >= 400:
-                raise Exception(f"HTTP {self.status}")
-
     class FakeSession:
         def get(self, url):                          
             return FakeResponse(xml_text, status=200)
@@ -59,9 +77,261 @@ async def test_sitemap_parser():
     assert "https://example.com/page1" in urls
     assert "https://example.com/page2" in urls
     
+    xml_text = """<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+    <url><loc>https://example.com/a?x=1&amp;y=2</loc><image:image><image:loc>https://example.com/i.png</image:loc></image:image></url>
+    <url><loc><![CDATA[ https://example.com/cdata ]]></loc></url>
+    <url><loc>   </loc></url>
+</urlset>"""
+
+    class ChunkedSession:
+        def get(self, url):
+            return FakeResponse(xml_text, status=200, chunk_size=5)
+
+    parser = SitemapParser(session=ChunkedSession())
+    urls = await parser.fetch_sitemap("https://example.com/sitemap.xml")
+    
+    assert urls == ["https://example.com/a?x=1&y=2", "https://example.com/cdata"], f"Unexpected URLs: {urls}"
+    
     print("PASS: Sitemap parser works correctly")
 
 
+async def test_sitemap_index():
+    print("\n=== Test: Sitemap Index ===")
+    
+    documents = {
+        "https://example.com/sitemap.xml": """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <sitemap><loc>https://example.com/sitemap-a.xml</loc></sitemap>
+    <sitemap><loc>https://example.com/sitemap-b.xml</loc></sitemap>
+</sitemapindex>""",
+        "https://example.com/sitemap-a.xml": """<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url><loc>https://example.com/a1</loc></url>
+    <url><loc>https://example.com/a2</loc></url>
+</urlset>""",
+        "https://example.com/sitemap-b.xml": gzip.compress(b"""<urlset>
+    <url><loc> https://example.com/b1 </loc></url>
+</urlset>"""),
+    }
+
+    class FakeSession:
+        def __init__(self):
+            self.gets = []
+
+        def get(self, url):
+            self.gets.append(url)
+            return FakeResponse(documents[url], status=200, chunk_size=7)
+
+    session = FakeSession()
+    parser = SitemapParser(session=session)
+    urls = await parser.fetch_sitemap("https://example.com/sitemap.xml")
+    
+    assert sorted(urls) == [
+        "https://example.com/a1",
+        "https://example.com/a2",
+        "https://example.com/b1",
+    ], f"Unexpected URLs: {urls}"
+    
+    session = FakeSession()
+    parser = SitemapParser(session=session)
+    first, second = await asyncio.gather(
+        parser.fetch_sitemap("https://example.com/sitemap.xml"),
+        parser.fetch_sitemap("https://example.com/sitemap.xml/"),
+    )
+    
+    assert sorted(first) == sorted(second) == sorted(urls), "Concurrent callers should share one fetch"
+    assert len(session.gets) == 3, f"Each sitemap should be fetched once: {session.gets}"
+    
+    documents["https://example.com/other-index.xml"] = """<sitemapindex>
+    <sitemap><loc>https://example.com/sitemap-a.xml</loc></sitemap>
+</sitemapindex>"""
+    class SlowResponse(FakeResponse):
+        async def __aenter__(self):
+            await asyncio.sleep(0.01)
+            return self
+    
+    class SlowSession(FakeSession):
+        def get(self, url):
+            self.gets.append(url)
+            return SlowResponse(documents[url], status=200, chunk_size=7)
+    
+    session = SlowSession()
+    parser = SitemapParser(session=session)
+    full, partial = await asyncio.gather(
+        parser.fetch_sitemap("https://example.com/sitemap.xml"),
+        parser.fetch_sitemap("https://example.com/other-index.xml"),
+    )
+    
+    assert sorted(full) == sorted(urls), f"Index sharing a child should keep it: {full}"
+    assert sorted(partial) == ["https://example.com/a1", "https://example.com/a2"], f"Shared child should be replayed: {partial}"
+    assert session.gets.count("https://example.com/sitemap-a.xml") == 1, f"Shared child should be fetched once: {session.gets}"
+    
+    documents["https://example.com/loop.xml"] = """<sitemapindex>
+    <sitemap><loc>https://example.com/loop.xml</loc></sitemap>
+    <sitemap><loc>https://example.com/sitemap-a.xml</loc></sitemap>
+</sitemapindex>"""
+    parser = SitemapParser(session=FakeSession())
+    looped = await asyncio.wait_for(parser.fetch_sitemap("https://example.com/loop.xml"), 5)
+    
+    assert sorted(looped) == ["https://example.com/a1", "https://example.com/a2"], f"Self-referencing index should terminate: {looped}"
+    
+    diamond = {
+        "https://example.com/a.xml": "<sitemapindex><sitemap><loc>https://example.com/b.xml</loc></sitemap><sitemap><loc>https://example.com/c.xml</loc></sitemap></sitemapindex>",
+        "https://example.com/b.xml": "<sitemapindex><sitemap><loc>https://example.com/d.xml</loc></sitemap></sitemapindex>",
+        "https://example.com/c.xml": "<sitemapindex><sitemap><loc>https://example.com/d.xml</loc></sitemap></sitemapindex>",
+        "https://example.com/d.xml": "<urlset><url><loc>https://example.com/d1</loc></url></urlset>",
+    }
+    
+    class DiamondSession:
+        def __init__(self, slow):
+            self.slow = slow
+        
+        def get(self, url):
+            response_class = SlowResponse if url == self.slow else FakeResponse
+            return response_class(diamond[url], status=200)
+    
+    for slow in diamond:
+        parser = SitemapParser(session=DiamondSession(slow))
+        urls = await parser.fetch_sitemap("https://example.com/a.xml")
+        assert urls == ["https://example.com/d1"], f"Diamond index should yield d once (slow {slow}): {urls}"
+    
+    print("PASS: Sitemap index is followed")
+
+
+async def test_sitemap_owner_abort():
+    print("\n=== Test: Sitemap Owner Abort ===")
+    
+    body = "<urlset>" + "".join(f"<url><loc>https://example.com/p{i}</loc></url>" for i in range(5000)) + "</urlset>"
+    
+    class SlowResponse(FakeResponse):
+        async def __aenter__(self):
+            await asyncio.sleep(0.01)
+            return self
+    
+    class FakeSession:
+        def get(self, url):
+            return SlowResponse(body, status=200, chunk_size=4096)
+    
+    parser = SitemapParser(session=FakeSession())
+    
+    async def owner():
+        async for _ in parser.iter_sitemap("https://example.com/big.xml"):
+            await asyncio.sleep(0)
+    
+    owner_task = asyncio.create_task(owner())
+    await asyncio.sleep(0.02)
+    waiter = asyncio.create_task(parser.fetch_sitemap("https://example.com/big.xml"))
+    await asyncio.sleep(0)
+    owner_task.cancel()
+    urls = await waiter
+    
+    assert len(urls) == 5000, f"Waiter should not get a cancelled owner's partial result: {len(urls)}"
+    
+    parser = SitemapParser(session=FakeSession())
+    
+    async def stop_early():
+        async for _ in parser.iter_sitemap("https://example.com/big.xml"):
+            break
+    
+    stopper = asyncio.create_task(stop_early())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(parser.fetch_sitemap("https://example.com/big.xml"))
+    await stopper
+    urls = await waiter
+    
+    assert len(urls) == 5000, f"Waiter should not get an abandoned walk's partial result: {len(urls)}"
+    
+    parser = SitemapParser(session=FakeSession())
+    async for _ in parser.iter_sitemap("https://example.com/big.xml"):
+        break
+    urls = await parser.fetch_sitemap("https://example.com/big.xml")
+    
+    assert len(urls) == 5000, f"Abandoned sitemap should not stay visited: {len(urls)}"
+    
+    print("PASS: Aborted sitemap walks are not published")
+
+
+async def test_sitemap_discovery():
+    print("\n=== Test: Sitemap Discovery ===")
+    
+    documents = {
+        "https://example.com/sitemaps/sitemap.xml": """<urlset>
+    <url><loc>https://example.com/found</loc></url>
+</urlset>""",
+    }
+
+    class FakeSession:
+        def __init__(self):
+            self.heads = []
+            self.gets = []
+
+        def head(self, url, allow_redirects=False):
+            self.heads.append(url)
+            return FakeResponse("", status=200 if url in documents else 404)
+
+        def get(self, url):
+            self.gets.append(url)
+            return FakeResponse(documents.get(url, ""), status=200 if url in documents else 404)
+
+    session = FakeSession()
+    parser = SitemapParser(session=session)
+    urls = await parser.discover_sitemap_urls("https://example.com/")
+    
+    assert urls == ["https://example.com/found"], f"Unexpected URLs: {urls}"
+    assert len(session.heads) == 4, "All candidate paths should be probed"
+    assert session.gets == ["https://example.com/sitemaps/sitemap.xml"], f"Only the live sitemap should be fetched: {session.gets}"
+    
+    documents = {
+        "https://example.com/robots.txt": "User-agent: *\nDisallow:\n  SITEMAP:  https://example.com/custom.xml\n",
+        "https://example.com/custom.xml": "<urlset><url><loc>https://example.com/from-robots</loc></url></urlset>",
+    }
+    parser = SitemapParser(session=FakeSession())
+    urls = await parser.discover_sitemap_urls("https://example.com/")
+    
+    assert urls == ["https://example.com/from-robots"], f"Unexpected URLs from robots.txt: {urls}"
+    
+    documents = {
+        "https://example.com/sitemap.xml": "<urlset></urlset>",
+        "https://example.com/sitemaps/sitemap.xml": "<urlset><url><loc>https://example.com/second</loc></url></urlset>",
+    }
+    session = FakeSession()
+    parser = SitemapParser(session=session)
+    urls = await parser.discover_sitemap_urls("https://example.com/")
+    
+    assert urls == ["https://example.com/second"], f"Empty sitemap should be skipped: {urls}"
+    assert sorted(session.gets) == sorted(documents), f"Live candidates should be fetched together: {session.gets}"
+    
+    documents = {
+        "https://example.com/sitemap.xml": """<sitemapindex>
+    <sitemap><loc>https://example.com/a.xml</loc></sitemap>
+    <sitemap><loc>https://example.com/b.xml</loc></sitemap>
+</sitemapindex>""",
+        "https://example.com/sitemap_index.xml": """<sitemapindex>
+    <sitemap><loc>https://example.com/b.xml</loc></sitemap>
+</sitemapindex>""",
+        "https://example.com/a.xml": "<urlset><url><loc>https://example.com/a1</loc></url></urlset>",
+        "https://example.com/b.xml": "<urlset><url><loc>https://example.com/b1</loc></url></urlset>",
+    }
+    
+    class SlowResponse(FakeResponse):
+        async def __aenter__(self):
+            await asyncio.sleep(0.01)
+            return self
+    
+    class SlowIndexSession(FakeSession):
+        def get(self, url):
+            if url == "https://example.com/sitemap.xml":
+                return SlowResponse(documents[url], status=200)
+            return super().get(url)
+    
+    parser = SitemapParser(session=SlowIndexSession())
+    urls = await parser.discover_sitemap_urls("https://example.com/")
+    
+    assert sorted(urls) == ["https://example.com/a1", "https://example.com/b1"], f"Shared child should not be lost: {urls}"
+    assert "https://example.com/sitemap_index.xml" not in parser.visited_sitemaps, "Losing candidates should not mark sitemaps visited"
+    
+    print("PASS: Sitemap discovery probes candidates")
+
+
 async def test_crawler_stats():
     print("\n=== Test: Crawler Stats ===")
     
@@ -92,7 +362,7 @@ async def test_crawler_stats():
         json_file = f.name
     
     try:
-        stats.export_to_json(json_file)
+        await stats.export_to_json(json_file)
         assert os.path.exists(json_file), "JSON file should be created"
         os.remove(json_file)
     except Exception:
@@ -105,7 +375,7 @@ async def test_crawler_stats():
         html_file = f.name
     
     try:
-        stats.export_to_html_report(html_file)
+        await stats.export_to_html_report(html_file)
         assert os.path.exists(html_file), "HTML file should be created"
                                                     
         with open(html_file, 'r', encoding='utf-8') as f:
@@ -121,6 +391,141 @@ async def test_crawler_stats():
     print("PASS: Crawler stats work correctly")
 
 
+async def test_stats_page_time_totals():
+    print("\n=== Test: Stats Page Time Totals ===")
+    
+    stats = CrawlerStats()
+    for page_time in (0.5, 0.3, 0.2):
+        stats.add_page("https://example.com/page", "success", page_time)
+    
+    performance = stats.get_stats()["performance"]
+    assert abs(performance["avg_page_time"] - 1.0 / 3) < 1e-9
+    assert abs(performance["total_time"] - 1.0) < 1e-9
+    assert performance["elapsed_time"] == 0, "Unstarted stats should report zero elapsed time"
+    
+    print("PASS: Page time totals are tracked")
+
+
+async def test_stats_domains():
+    print("\n=== Test: Stats Domains ===")
+    
+    stats = CrawlerStats()
+    stats.add_page("https://example.com/page1", "success", 0.1)
+    stats.add_page("https://example.com/page2", "failed", 0.1, "boom")
+    stats.add_page("https://example.com:8443?q=1", "success", 0.1)
+    
+    domains = stats.get_stats()["domains"]
+    assert domains == {"example.com": {"pages": 3, "successful": 2, "failed": 1}}, f"Port and query should not split the domain: {domains}"
+    
+    print("PASS: Pages are counted per domain")
+
+
+async def test_stats_status_codes():
+    print("\n=== Test: Stats Status Codes ===")
+    
+    stats = CrawlerStats()
+    stats.add_status_code(503)
+    stats.add_status_code(999)
+    stats.add_status_code(503)
+    
+    assert stats.get_stats()["status_codes"] == {503: 2, 999: 1}, "Unusual status codes should be counted"
+    
+    print("PASS: Status codes are counted")
+
+
+async def test_stats_bounded_errors():
+    print("\n=== Test: Stats Bounded Errors ===")
+    
+    stats = CrawlerStats(max_errors=2)
+    for i in range(3):
+        stats.add_page(f"https://example.com/e{i}", "failed", 0.1, "boom")
+    
+    assert len(stats._recent_errors) == 2, "Error log should be bounded"
+    assert stats._recent_errors[0] == ("https://example.com/e1", "example.com", "boom"), "Only the most recent errors should be kept"
+    assert stats.get_stats()["errors_count"] == 3, "Error count should include evicted entries"
+    
+    print("PASS: Error log keeps the most recent errors")
+
+
+async def test_stats_json_export():
+    print("\n=== Test: Stats JSON Export ===")
+    
+    stats = CrawlerStats()
+    stats.add_page("https://example.com/page1", "success", 0.5)
+    stats.add_page("https://example.com/page2", "failed", 0.2, "404 Not Found")
+    stats.add_status_code(200)
+    
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as f:
+        json_file = f.name
+    
+    try:
+        await stats.export_to_json(json_file)
+        with open(json_file, 'r', encoding='utf-8') as f:
+            exported = json.load(f)
+        with patch("crawler.stats.orjson", None):
+            await stats.export_to_json(json_file)
+        with open(json_file, 'r', encoding='utf-8') as f:
+            fallback = json.load(f)
+    finally:
+        os.remove(json_file)
+    
+    assert exported["stats"] == fallback["stats"], "orjson and json exports should match"
+    assert exported["stats"]["status_codes"]["200"] == 1
+    assert exported["stats"]["domains"]["example.com"] == {"pages": 2, "successful": 1, "failed": 1}
+    
+    print("PASS: JSON export matches with and without orjson")
+
+
+async def test_stats_export_snapshot():
+    print("\n=== Test: Stats Export Snapshot ===")
+    
+    stats = CrawlerStats()
+    stats.start()
+    for i in range(2000):
+        stats.add_page(f"https://site{i % 50}.com/{i}", "success", 0.01)
+    
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as f:
+        json_file = f.name
+    
+    try:
+        export = asyncio.create_task(stats.export_to_json(json_file))
+        await asyncio.sleep(0)
+        for i in range(20000):
+            stats.add_page(f"https://site{i % 50}.com/more{i}", "success", 0.01)
+        await export
+        with open(json_file, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)["stats"]
+    finally:
+        os.remove(json_file)
+    
+    domain_pages = sum(counts["pages"] for counts in snapshot["domains"].values())
+    assert domain_pages == snapshot["total_pages"] == 2000, f"Export should be one consistent snapshot: {domain_pages} vs {snapshot['total_pages']}"
+    
+    print("PASS: JSON export is a consistent snapshot")
+
+
+async def test_stats_html_escaping():
+    print("\n=== Test: Stats HTML Escaping ===")
+    
+    stats = CrawlerStats()
+    stats.add_page("https://example.com/<script>", "failed", 0.1, "bad <tag>")
+    
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.html') as f:
+        html_file = f.name
+    
+    try:
+        await stats.export_to_html_report(html_file)
+        with open(html_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+    finally:
+        os.remove(html_file)
+    
+    assert "&lt;script&gt;" in content and "bad &lt;tag&gt;" in content
+    assert "<script>" not in content
+    
+    print("PASS: HTML report escapes URLs and errors")
+
+
 async def test_config_loader():
     print("\n=== Test: Config Loader ===")
     
@@ -178,6 +583,7 @@ async def test_advanced_crawler_init():
     assert crawler.stats is not None
     assert crawler.sitemap_parser is not None
     assert crawler.crawler.max_workers == 2
+    assert crawler.sitemap_parser.max_concurrent == 2
     assert crawler.crawler.max_depth == 1
     
     await crawler.close()
@@ -224,7 +630,17 @@ async def main():
     print("=== Running Day 7 Tests ===")
     
     await test_sitemap_parser()
+    await test_sitemap_index()
+    await test_sitemap_owner_abort()
+    await test_sitemap_discovery()
     await test_crawler_stats()
+    await test_stats_page_time_totals()
+    await test_stats_domains()
+    await test_stats_status_codes()
+    await test_stats_bounded_errors()
+    await test_stats_json_export()
+    await test_stats_export_snapshot()
+    await test_stats_html_escaping()
     await test_config_loader()
     await test_advanced_crawler_init()
     await test_advanced_crawler_from_config()